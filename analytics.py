@@ -0,0 +1,411 @@
+"""Offline analytics over recorded choice telemetry.
+
+Reads the JSONL files written by telemetry.py into columns, one row per
+transition: session, node, choice label and next node as int32 ids into
+string tables, and time-to-decide as float32 (about 20 bytes a row).
+Files are parsed in chunks of CHUNK_ROWS lines, so the JSON text is never
+held whole, and each file's columns are cached under telemetry/.columns/
+so later runs skip parsing entirely.
+
+Every report is computed with numpy array operations over the columns:
+
+    choices    per node, how often each choice was taken
+    decide_ms  median time-to-decide, overall and per node
+    funnel     playthroughs still going after each number of choices,
+               and how many reached each ending
+    paths      most common routes to each ending
+
+A playthrough is a session's run of choices up to an ending; the next
+one starts from wherever "Try Again" leads.
+
+    python analytics.py [telemetry/] [-o report.json] [--top 5]
+    python analytics.py --bench 1000000     # synthetic telemetry, timed
+"""
+import argparse
+import glob
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from story import STORY
+from telemetry import TELEMETRY_DIR
+
+CHUNK_ROWS = 64 * 1024
+CACHE_DIR = ".columns"
+CACHE_VERSION = 1
+PATH_HASH_BASE = 1000003
+
+
+class Interner:
+    """Maps strings to dense int ids"""
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def __call__(self, name):
+        index = self.ids.get(name)
+        if index is None:
+            index = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def remap(self, names):
+        """Lookup array translating ids from another table into this one"""
+        return np.array([self(name) for name in names], dtype=np.int32)
+
+
+class Columns:
+    """One row per transition; string columns are int32 ids into the tables"""
+    FIELDS = ("session", "node", "choice", "next", "ms")
+
+    def __init__(self):
+        self.sessions = Interner()
+        self.nodes = Interner()
+        self.labels = Interner()
+        self.parts = {field: [] for field in self.FIELDS}
+        self.session = self.node = self.choice = self.next = self.ms = None
+
+    def append(self, columns, tables):
+        """Add a block of columns whose ids refer to `tables` (local string tables)"""
+        node_remap = self.nodes.remap(tables["node"])
+        remaps = {
+            "session": self.sessions.remap(tables["session"]),
+            "node": node_remap,
+            "choice": self.labels.remap(tables["choice"]),
+            "next": node_remap
+        }
+        for field in self.FIELDS:
+            column = columns[field]
+            if field in remaps:
+                column = remaps[field][column]
+            self.parts[field].append(column)
+
+    def finish(self):
+        for field in self.FIELDS:
+            parts = self.parts[field]
+            dtype = np.float32 if field == "ms" else np.int32
+            setattr(self, field, np.concatenate(parts) if parts else np.zeros(0, dtype=dtype))
+        self.parts = {field: [] for field in self.FIELDS}
+        return self
+
+    def __len__(self):
+        return 0 if self.node is None else len(self.node)
+
+
+def _parse_file(path):
+    """Parse one JSONL file chunk by chunk into columns with file-local string tables"""
+    tables = {"session": Interner(), "node": Interner(), "choice": Interner()}
+    session_id, node_id, choice_id = tables["session"], tables["node"], tables["choice"]
+    parts = {field: [] for field in Columns.FIELDS}
+    with open(path) as f:
+        while True:
+            lines = [line for line in itertools.islice(f, CHUNK_ROWS) if line.strip()]
+            if not lines:
+                break
+            try:
+                rows = json.loads("[" + ",".join(lines) + "]")
+            except ValueError:
+                # A torn last line (writer killed mid-batch); keep the rows that parse
+                rows = []
+                for line in lines:
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        pass
+            parts["session"].append(np.array([session_id(r["session"]) for r in rows], dtype=np.int32))
+            parts["node"].append(np.array([node_id(r["node"]) for r in rows], dtype=np.int32))
+            parts["choice"].append(np.array([choice_id(r["choice"]) for r in rows], dtype=np.int32))
+            parts["next"].append(np.array([node_id(r["next"]) for r in rows], dtype=np.int32))
+            parts["ms"].append(np.array([r["ms_to_decide"] for r in rows], dtype=np.float32))
+    columns = {
+        field: np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32 if field == "ms" else np.int32)
+        for field, chunks in parts.items()
+    }
+    return columns, {name: table.names for name, table in tables.items()}
+
+
+def _load_file(path, use_cache=True):
+    """Columns for one telemetry file, from the column cache when it is current"""
+    stat = os.stat(path)
+    cache_dir = os.path.join(os.path.dirname(path), CACHE_DIR)
+    cache_path = os.path.join(cache_dir, os.path.basename(path) + ".npz")
+    key = np.array([CACHE_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+    if use_cache and os.path.exists(cache_path):
+        try:
+            with np.load(cache_path) as cached:
+                if np.array_equal(cached["key"], key):
+                    columns = {field: cached[field] for field in Columns.FIELDS}
+                    tables = {name: cached["table_" + name].tolist() for name in ("session", "node", "choice")}
+                    return columns, tables
+        except (OSError, ValueError, KeyError):
+            pass
+
+    columns, tables = _parse_file(path)
+    if use_cache:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = cache_path + ".tmp.npz"
+            np.savez(tmp, key=key, **columns, **{
+                "table_" + name: np.array(names, dtype=str) for name, names in tables.items()
+            })
+            os.replace(tmp, cache_path)
+        except OSError as e:
+            print(f"Error caching columns for {path}: {e}")
+    return columns, tables
+
+
+def telemetry_files(paths):
+    """Expand directories into their telemetry files, oldest first"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "choices-*.jsonl"))))
+        else:
+            files.append(path)
+    return files
+
+
+def load(paths, use_cache=True):
+    columns = Columns()
+    for path in telemetry_files(paths):
+        columns.append(*_load_file(path, use_cache))
+    # Drop cache files whose telemetry file has been rotated away
+    for path in paths:
+        cache_dir = os.path.join(path, CACHE_DIR)
+        if use_cache and os.path.isdir(cache_dir):
+            for name in os.listdir(cache_dir):
+                if name.endswith(".npz") and not os.path.exists(os.path.join(path, name[:-4])):
+                    os.remove(os.path.join(cache_dir, name))
+    return columns.finish()
+
+
+def _ending_mask(columns, endings=STORY.endings):
+    """Bool array over node ids: True for ending nodes"""
+    return np.array([name in endings for name in columns.nodes.names], dtype=bool)
+
+
+def choice_distributions(columns):
+    n_labels = max(1, len(columns.labels))
+    counts = np.bincount(
+        columns.node.astype(np.int64) * n_labels + columns.choice,
+        minlength=len(columns.nodes) * n_labels
+    ).reshape(len(columns.nodes), n_labels)
+    totals = counts.sum(axis=1)
+    report = {}
+    for node in np.flatnonzero(totals):
+        row = counts[node]
+        taken = np.flatnonzero(row)
+        taken = taken[np.argsort(-row[taken], kind="stable")]
+        report[columns.nodes.names[node]] = {
+            "total": int(totals[node]),
+            "choices": {
+                columns.labels.names[label]: {"count": int(row[label]), "share": round(float(row[label] / totals[node]), 4)}
+                for label in taken
+            }
+        }
+    return report
+
+
+def decide_times(columns):
+    """Median time-to-decide overall and per node (ms)"""
+    if not len(columns):
+        return {"median_ms": None, "by_node": {}}
+    order = np.lexsort((columns.ms, columns.node))
+    nodes = columns.node[order]
+    ms = columns.ms[order]
+    starts = np.flatnonzero(np.r_[True, nodes[1:] != nodes[:-1]])
+    counts = np.diff(np.r_[starts, len(nodes)])
+    medians = (ms[starts + (counts - 1) // 2] + ms[starts + counts // 2]) / 2.0
+    return {
+        "median_ms": round(float(np.median(columns.ms)), 1),
+        "by_node": {
+            columns.nodes.names[node]: {"median_ms": round(float(median), 1), "count": int(count)}
+            for node, median, count in zip(nodes[starts], medians, counts)
+        }
+    }
+
+
+def _playthroughs(columns, ending_mask):
+    """Split rows into playthroughs: ordered by session, breaking after each ending.
+
+    Returns the row order and, per playthrough, its first row, length and
+    whether it reached an ending.
+    """
+    order = np.argsort(columns.session, kind="stable")  # Stable: keeps each session's rows in time order
+    session = columns.session[order]
+    ended = ending_mask[columns.next[order]]
+    starts_mask = np.ones(len(order), dtype=bool)
+    starts_mask[1:] = (session[1:] != session[:-1]) | ended[:-1]
+    starts = np.flatnonzero(starts_mask)
+    lengths = np.diff(np.r_[starts, len(order)])
+    complete = ended[starts + lengths - 1]
+    return order, starts, lengths, complete
+
+
+def funnel(columns, ending_mask, playthroughs, max_depth=30):
+    order, starts, lengths, complete = playthroughs
+    if not len(starts):
+        return {"playthroughs": 0, "by_depth": [], "endings": {}}
+    # Playthroughs that made at least d choices, for d = 1..max_depth
+    at_least = np.cumsum(np.bincount(lengths, minlength=max_depth + 1)[::-1])[::-1]
+    endings = columns.next[order][starts + lengths - 1][complete]
+    ending_lengths = lengths[complete]
+    per_ending = {}
+    for node in np.unique(endings):
+        reached = ending_lengths[endings == node]
+        name = columns.nodes.names[node]
+        per_ending[STORY.endings.get(name, name)] = {
+            "node": name,
+            "playthroughs": int(len(reached)),
+            "share": round(len(reached) / len(starts), 4),
+            "median_choices": float(np.median(reached))
+        }
+    return {
+        "playthroughs": int(len(starts)),
+        "completed": int(complete.sum()),
+        "by_depth": [int(n) for n in at_least[1:max_depth + 1]],
+        "endings": dict(sorted(per_ending.items(), key=lambda item: -item[1]["playthroughs"]))
+    }
+
+
+def common_paths(columns, playthroughs, top=5):
+    """Most frequent node sequences leading to each ending"""
+    order, starts, lengths, complete = playthroughs
+    if not complete.any():
+        return {}
+    node = columns.node[order]
+    nxt = columns.next[order]
+
+    # Polynomial hash of each playthrough's node sequence, wrapping in uint64
+    seg = np.repeat(np.arange(len(starts)), lengths)
+    pos = np.arange(len(order)) - starts[seg]
+    with np.errstate(over="ignore"):
+        powers = np.power(np.uint64(PATH_HASH_BASE), pos.astype(np.uint64))
+        hashes = np.add.reduceat((node.astype(np.uint64) + np.uint64(1)) * powers, starts)
+        hashes ^= lengths.astype(np.uint64) << np.uint64(48)
+
+    done = np.flatnonzero(complete)
+    endings = nxt[starts[done] + lengths[done] - 1]
+    report = {}
+    for ending in np.unique(endings):
+        members = done[endings == ending]
+        unique, first, counts = np.unique(hashes[members], return_index=True, return_counts=True)
+        best = np.argsort(-counts, kind="stable")[:top]
+        name = columns.nodes.names[ending]
+        routes = []
+        for i in best:
+            p = members[first[i]]
+            path = [columns.nodes.names[n] for n in node[starts[p]:starts[p] + lengths[p]]] + [name]
+            routes.append({"count": int(counts[i]), "share": round(int(counts[i]) / len(members), 4), "path": path})
+        report[STORY.endings.get(name, name)] = routes
+    return report
+
+
+def analyze(columns, top=5):
+    ending_mask = _ending_mask(columns)
+    playthroughs = _playthroughs(columns, ending_mask)
+    return {
+        "transitions": len(columns),
+        "sessions": len(columns.sessions),
+        "choices": choice_distributions(columns),
+        "decide_ms": decide_times(columns),
+        "funnel": funnel(columns, ending_mask, playthroughs),
+        "paths": common_paths(columns, playthroughs, top)
+    }
+
+
+def write_synthetic(directory, rows, sessions=5000, seed=1):
+    """Telemetry files from random playthroughs of the real story, for benchmarking"""
+    from story import Playthrough
+    from telemetry import TelemetryRecorder
+    rng = random.Random(seed)
+    recorder = TelemetryRecorder(directory, max_file_bytes=64 * 1024 * 1024)
+    players = [Playthrough() for _ in range(sessions)]
+    for play in players:
+        play.enter()
+    batch = []
+    for n in range(rows):
+        i = rng.randrange(sessions)
+        play = players[i]
+        if not play.choices:
+            play.node_id = "start"
+            play.enter()
+        node = play.node_id
+        choice = play.choose(rng.randrange(len(play.choices)))
+        play.enter()
+        batch.append((n * 0.01, f"s{i}", node, choice.label, choice.target, rng.lognormvariate(8, 0.7)))
+        if len(batch) == CHUNK_ROWS:
+            recorder._write(batch)
+            batch = []
+    if batch:
+        recorder._write(batch)
+    recorder._file.close()
+
+
+def bench(rows):
+    directory = tempfile.mkdtemp(prefix="bandersnatch-telemetry-")
+    try:
+        start = time.perf_counter()
+        write_synthetic(directory, rows)
+        generated = time.perf_counter() - start
+
+        timings = {}
+        for run in ("parse", "cached"):
+            start = time.perf_counter()
+            columns = load([directory])
+            timings[f"load_{run}_s"] = round(time.perf_counter() - start, 3)
+        start = time.perf_counter()
+        report = analyze(columns)
+        timings["analyze_s"] = round(time.perf_counter() - start, 3)
+        return {
+            "transitions": len(columns),
+            "generate_s": round(generated, 3),
+            **timings,
+            "column_bytes": sum(getattr(columns, field).nbytes for field in Columns.FIELDS),
+            "playthroughs": report["funnel"]["playthroughs"],
+            "endings": len(report["paths"])
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze recorded choice telemetry")
+    parser.add_argument("paths", nargs="*", default=[TELEMETRY_DIR], help="telemetry directories or JSONL files")
+    parser.add_argument("--top", type=int, default=5, help="paths to list per ending")
+    parser.add_argument("--no-cache", action="store_true", help="always parse the JSONL, don't read or write column caches")
+    parser.add_argument("-o", "--output", help="write the JSON report here as well as stdout")
+    parser.add_argument("--bench", type=int, metavar="ROWS", help="time loading and analysis on synthetic telemetry")
+    args = parser.parse_args()
+
+    if not NUMPY_AVAILABLE:
+        print("numpy not available - install numpy to run analytics")
+        return 1
+    if args.bench:
+        print(json.dumps(bench(args.bench), indent=2))
+        return 0
+
+    report = analyze(load(args.paths, use_cache=not args.no_cache), args.top)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
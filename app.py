@@ -1,7 +1,6 @@
 import tkinter as tk
 from tkinter import font, ttk
 import sys
-import winsound
 import threading
 import random
 import struct
@@ -9,6 +8,26 @@ import io
 import math
 import os
 import json
+import time
+import functools
+import argparse
+import uuid
+
+from perftrace import TRACER, traced, enable_from_env
+from story import STORY, COMPILED_NODES, state, reset_state, preview_choice
+from checkpoints import CheckpointLog
+from saves import SaveSlots
+from layout import LayoutCache
+from pacing import PROFILES, TURBO, DEFAULT_PROFILE, get_profile
+from clock import TkClock
+from assets import open_bundle
+from memwatch import MemoryWatch, MEMWATCH_ENV
+from telemetry import TelemetryRecorder
+
+try:
+    import winsound
+except ImportError:
+    winsound = None # Not on Windows: no fallback when pygame is missing
 
 try:
     import pygame
@@ -19,17 +38,13 @@ except:
     print("pygame not available - background music disabled")
 
 CURRENT_MUSIC_TYPE = None # Track what's currently playing
-
-# Game State
-state = {
-    "cereal": None,
-    "music": None,
-    "offer": None,
-    "colin_follow": False,
-    "mohan_counter": 0,
-    "inventory": [],
-    "volume": 0.3
-}
+MAX_TRANSCRIPT = 300 # Messages kept on screen and in the save; older ones are dropped
+FRAME_MS = 16 # Scrolling and resize work is batched to one pass per frame
+# Bubbles wrap at a share of the conversation's width, in steps so a drag doesn't lay text out at every pixel
+BUBBLE_WIDTH_RATIO = 0.57
+BUBBLE_WIDTH_STEP = 20
+MIN_BUBBLE_WIDTH = 260
+MAX_BUBBLE_WIDTH = 760
 
 # Font Configuration
 # We prefer 'Special Elite' (Google Font), fallback to 'Courier New' for typewriter feel
@@ -80,22 +95,36 @@ def load_custom_sound(filename, default_generator):
             print(f"Error loading {filename}: {e}")
     return default_generator()
 
+# Sounds and music come from the memory-mapped bundle when there is one (see assets.py);
+# opened with the sounds, so nothing is built when there's no mixer to play them
+ASSETS = None
+
+def load_sound(filename, default_generator):
+    """pygame Sound for an asset, read from the bundle without copying it into Python bytes"""
+    if ASSETS and filename in ASSETS:
+        pcm = ASSETS.pcm(filename)
+        mixer = pygame.mixer.get_init() # (frequency, size, channels)
+        if pcm and mixer and pcm[2] == 16 and (pcm[1], mixer[1], pcm[3]) == (mixer[0], -16, mixer[2]):
+            # Already in the mixer's sample format: hand over the samples directly
+            return pygame.mixer.Sound(buffer=pcm[0])
+        return pygame.mixer.Sound(file=ASSETS.reader(filename))
+    return pygame.mixer.Sound(io.BytesIO(load_custom_sound(filename, default_generator)))
+
 # Load sounds using pygame for better performance if available
 TYPE_SOUND_OBJ = None
 CLICK_SOUND_OBJ = None
 
 def init_pygame_sounds():
-    global TYPE_SOUND_OBJ, CLICK_SOUND_OBJ
+    global TYPE_SOUND_OBJ, CLICK_SOUND_OBJ, ASSETS
     if not PYGAME_AVAILABLE:
         return
+    ASSETS = open_bundle()
         
     # Load Click
-    click_data = load_custom_sound("click.wav", lambda: generate_click_sound(duration_ms=4, volume=0.8))
-    CLICK_SOUND_OBJ = pygame.mixer.Sound(io.BytesIO(click_data))
+    CLICK_SOUND_OBJ = load_sound("click.wav", lambda: generate_click_sound(duration_ms=4, volume=0.8))
     
     # Load Typing
-    type_data = load_custom_sound("typing.wav", lambda: generate_click_sound(duration_ms=3, volume=0.2))
-    TYPE_SOUND_OBJ = pygame.mixer.Sound(io.BytesIO(type_data))
+    TYPE_SOUND_OBJ = load_sound("typing.wav", lambda: generate_click_sound(duration_ms=3, volume=0.2))
 
 # Initialize immediately
 init_pygame_sounds()
@@ -103,7 +132,7 @@ init_pygame_sounds()
 def play_click():
     if CLICK_SOUND_OBJ:
         CLICK_SOUND_OBJ.play()
-    else:
+    elif winsound:
         # Fallback to winsound if pygame failed
         click_data = load_custom_sound("click.wav", lambda: generate_click_sound(duration_ms=4, volume=0.8))
         threading.Thread(target=lambda: winsound.PlaySound(click_data, winsound.SND_MEMORY), daemon=True).start()
@@ -119,12 +148,42 @@ def stop_type():
     """Stop the typing sound"""
     if TYPE_SOUND_OBJ:
         TYPE_SOUND_OBJ.stop()
-    else:
+    elif winsound:
         try:
             winsound.PlaySound(None, winsound.SND_PURGE)
         except:
             pass
 
+def music_files(music_type):
+    """Candidate files for a music type, in order of preference"""
+    if music_type == "intense":
+        return ["intense.wav"]
+    return ["background.wav"]
+
+WARMED_MUSIC = set() # Music types already read ahead
+
+def warm_music(music_type):
+    """Read a music file once in the background so switching to it doesn't wait on the disk"""
+    if not PYGAME_AVAILABLE or music_type == CURRENT_MUSIC_TYPE or music_type in WARMED_MUSIC:
+        return
+    WARMED_MUSIC.add(music_type)
+    for music_file in music_files(music_type):
+        if ASSETS and music_file in ASSETS:
+            ASSETS.warm(music_file) # Already mapped; just have the OS page it in
+            return
+
+    def read():
+        for music_file in music_files(music_type):
+            try:
+                with open(music_file, "rb") as f:
+                    while f.read(1 << 20):
+                        pass
+                return
+            except OSError:
+                pass
+    threading.Thread(target=read, daemon=True).start()
+
+@traced("start_background_music")
 def start_background_music(music_type="normal"):
     """Start playing background music in a loop, handling transitions between types"""
     global CURRENT_MUSIC_TYPE
@@ -135,20 +194,19 @@ def start_background_music(music_type="normal"):
     if music_type == CURRENT_MUSIC_TYPE:
         return
         
-    # Track selection
-    if music_type == "intense":
-        files = [ "intense.wav"]
-    else:
-        files = ["background.wav"]
-
     # Try different file formats
-    for music_file in files:
-        if os.path.exists(music_file):
+    for music_file in music_files(music_type):
+        bundled = ASSETS is not None and music_file in ASSETS
+        if bundled or os.path.exists(music_file):
             try:
                 # Use current volume from state
                 vol = state.get("volume", 0.3)
 
-                pygame.mixer.music.load(music_file)
+                if bundled:
+                    # Streamed straight out of the mapped bundle
+                    pygame.mixer.music.load(ASSETS.reader(music_file), os.path.splitext(music_file)[1][1:])
+                else:
+                    pygame.mixer.music.load(music_file)
                 pygame.mixer.music.set_volume(vol) 
                 pygame.mixer.music.play(-1)  # -1 means loop forever
                 CURRENT_MUSIC_TYPE = music_type
@@ -167,14 +225,55 @@ def stop_background_music():
         except:
             pass
 
+SPLINE_STEPS = 12 # Segments per corner, as Tk's own smooth=True would use
+# Quadratic Bezier weights for each step along a corner, worked out once
+BEZIER_WEIGHTS = tuple(
+    ((1 - t) ** 2, 2 * (1 - t) * t, t * t)
+    for t in (i / SPLINE_STEPS for i in range(SPLINE_STEPS + 1))
+)
+
+@functools.lru_cache(maxsize=512)
+def rounded_rect_outline(x1, y1, x2, y2, r):
+    """Already-smoothed outline of a rounded rectangle, cached per shape.
+
+    Each corner is the curve Tk's smooth=True would draw through the
+    corner point, tessellated here once per (corners, radius). Items are
+    drawn with smooth=False, so Tk doesn't re-tessellate the spline on
+    every create or coords() call. Colour is applied per item and is not
+    part of the key.
+    """
+    corners = (
+        ((x2 - r, y1), (x2, y1), (x2, y1 + r)),
+        ((x2, y2 - r), (x2, y2), (x2 - r, y2)),
+        ((x1 + r, y2), (x1, y2), (x1, y2 - r)),
+        ((x1, y1 + r), (x1, y1), (x1 + r, y1)),
+    )
+    points = []
+    for (ax, ay), (bx, by), (cx, cy) in corners:
+        for wa, wb, wc in BEZIER_WEIGHTS:
+            points.append(wa * ax + wb * bx + wc * cx)
+            points.append(wa * ay + wb * by + wc * cy)
+    return tuple(points) # The straight sides join one corner's end to the next one's start
+
 class RoundedBubble(tk.Canvas):
-    def __init__(self, parent, text, max_width=400, bg_color="#ffffff", fg_color="#000000", is_user=False):
+    def __init__(self, parent, text, max_width=400, bg_color="#ffffff", fg_color="#000000", is_user=False, layout=None, final_text=None):
         super().__init__(parent, bg=parent["bg"], highlightthickness=0)
         self.bg_color = bg_color
         self.fg_color = fg_color
         self.is_user = is_user
         self.radius = 15  # Slightly tighter radius
         self.padding = 10 # Reduced padding (was 15)
+        self.bg_rect = None
+        self.size = None
+        self.max_width = max_width
+        self.final_text = final_text if final_text is not None else text
+        self.shown = len(text) # Characters typed so far
+        # With a precomputed layout of the final text the bubble starts at its final size,
+        # and typed prefixes are shown with the final line breaks
+        self.layout = layout
+        self.wrapped_text = layout.wrap(final_text if final_text is not None else text) if layout else None
+        if self.wrapped_text is not None:
+            text = self.wrapped_text[:len(text)]
         
         # Create Text Item first to measure size
         self.text_id = self.create_text(
@@ -191,12 +290,15 @@ class RoundedBubble(tk.Canvas):
         self.update_dimensions()
 
     def update_dimensions(self):
-        bbox = self.bbox(self.text_id)
-        if not bbox:
-            text_width, text_height = 0, 0
+        if self.layout:
+            text_width, text_height = self.layout.width, self.layout.height
         else:
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
+            bbox = self.bbox(self.text_id)
+            if not bbox:
+                text_width, text_height = 0, 0
+            else:
+                text_width = bbox[2] - bbox[0]
+                text_height = bbox[3] - bbox[1]
 
         # Calculate Canvas Dimensions
         canvas_width = text_width + (self.padding * 2) + 5 # Tighter fit
@@ -206,24 +308,46 @@ class RoundedBubble(tk.Canvas):
         canvas_width = max(canvas_width, 40)
         canvas_height = max(canvas_height, 35)
 
+        # Most typed characters don't change the bubble size; skip the redraw
+        if (canvas_width, canvas_height) == self.size:
+            return
+        self.size = (canvas_width, canvas_height)
+
         self.config(width=canvas_width, height=canvas_height)
         
-        # Draw Rounded Rect behind text
-        self.delete("bg_rect") # Remove old if exists
-        self.create_rounded_rect(0, 0, canvas_width, canvas_height, self.radius, self.bg_color, "bg_rect")
-        self.tag_lower("bg_rect", self.text_id)
+        # Draw Rounded Rect behind text, reshaping the existing one if we have it
+        points = rounded_rect_outline(0, 0, canvas_width, canvas_height, self.radius)
+        if self.bg_rect:
+            self.coords(self.bg_rect, *points)
+        else:
+            self.bg_rect = self.create_rounded_rect(0, 0, canvas_width, canvas_height, self.radius, self.bg_color, "bg_rect")
+            self.tag_lower("bg_rect", self.text_id)
 
     def create_rounded_rect(self, x1, y1, x2, y2, r, color, tag):
-        points = [x1+r, y1, x1+r, y1, x2-r, y1, x2-r, y1, x2, y1, x2, y1+r, x2, y1+r, x2, y2-r, x2, y2-r, x2, y2, x2-r, y2, x2-r, y2, x1+r, y2, x1+r, y2, x1, y2, x1, y2-r, x1, y2-r, x1, y1+r, x1, y1+r, x1, y1]
-        return self.create_polygon(points, smooth=True, fill=color, tags=tag)
+        points = rounded_rect_outline(x1, y1, x2, y2, r)
+        return self.create_polygon(points, fill=color, tags=tag)
 
     def update_text(self, new_text):
+        self.shown = len(new_text)
+        if self.wrapped_text is not None:
+            # Typing a prefix of the final text; its size is already known
+            self.itemconfig(self.text_id, text=self.wrapped_text[:len(new_text)])
+            return
         self.itemconfig(self.text_id, text=new_text)
         self.update_dimensions()
 
+    def reflow(self, max_width, layout=None):
+        """Rewrap at a new width, keeping however much of the text has been typed"""
+        self.max_width = max_width
+        self.layout = layout
+        self.wrapped_text = layout.wrap(self.final_text) if layout else None
+        shown = self.wrapped_text[:self.shown] if layout else self.itemcget(self.text_id, "text")
+        self.itemconfig(self.text_id, text=shown, width=max_width - (self.padding * 2))
+        self.update_dimensions()
+
 
 class RoundedButton(tk.Canvas):
-    def __init__(self, parent, text, command, width=250, height=45, radius=22, bg="#333333", fg="#FFFFFF", hover_bg="#555555", glow_color=None):
+    def __init__(self, parent, text, command, width=250, height=45, radius=22, bg="#333333", fg="#FFFFFF", hover_bg="#555555", glow_color=None, clock=None):
         # Slightly larger canvas if glowing to accommodate the light
         self.glow_color = glow_color
         self.glow_padding = 4 if glow_color else 0
@@ -241,17 +365,16 @@ class RoundedButton(tk.Canvas):
         self.height = height
         self.is_blinking = False
         self.blink_state = True
+        self.blink_job = None
+        self.blink_interval = 500
+        self.blink_slowdown = 1 # Interval multiplier while the window is unfocused
+        self.blink_paused = False # While the window is hidden
+        self.clock = clock or TkClock(self)
 
         # Create glow shape if specified
         self.glow_rect = None
         if self.glow_color:
-            self.glow_rect = self.create_rounded_rect(
-                0, 0, 
-                width + (self.glow_padding*2), 
-                height + (self.glow_padding*2), 
-                radius + 2, 
-                self.glow_color
-            )
+            self._create_glow()
         
         # Create main button shape
         self.rect = self.create_rounded_rect(
@@ -277,20 +400,78 @@ class RoundedButton(tk.Canvas):
         self.bind("<Leave>", self._on_leave)
 
     def create_rounded_rect(self, x1, y1, x2, y2, r, color):
-        points = [x1+r, y1, x1+r, y1, x2-r, y1, x2-r, y1, x2, y1, x2, y1+r, x2, y1+r, x2, y2-r, x2, y2-r, x2, y2, x2-r, y2, x2-r, y2, x1+r, y2, x1+r, y2, x1, y2, x1, y2-r, x1, y2-r, x1, y1+r, x1, y1+r, x1, y1]
-        return self.create_polygon(points, smooth=True, fill=color)
+        points = rounded_rect_outline(x1, y1, x2, y2, r)
+        return self.create_polygon(points, fill=color)
+
+    def _create_glow(self):
+        self.glow_rect = self.create_rounded_rect(
+            0, 0, 
+            self.width + (self.glow_padding*2), 
+            self.height + (self.glow_padding*2), 
+            self.radius + 2, 
+            self.glow_color
+        )
+        self.tag_lower(self.glow_rect)
+
+    def reconfigure(self, text, command, glow_color=None):
+        """Reuse this button for a new choice instead of building a new canvas"""
+        self.stop_blinking()
+        self.text = text
+        self.command = command
+        self.itemconfig(self.text_id, text=text)
+        self.itemconfig(self.rect, fill=self.default_bg)
+
+        glow_padding = 4 if glow_color else 0
+        if glow_padding != self.glow_padding:
+            # Glow needs a few extra pixels around the button; shift everything
+            shift = glow_padding - self.glow_padding
+            self.glow_padding = glow_padding
+            self.config(width=self.width + (glow_padding*2), height=self.height + (glow_padding*2))
+            self.move(self.rect, shift, shift)
+            self.move(self.text_id, shift, shift)
+
+        self.glow_color = glow_color
+        if glow_color:
+            self.blink_state = True
+            if self.glow_rect:
+                self.itemconfig(self.glow_rect, fill=glow_color, state="normal")
+            else:
+                self._create_glow()
+        elif self.glow_rect:
+            self.itemconfig(self.glow_rect, state="hidden")
 
     def start_blinking(self, interval=500):
-        if not self.glow_rect: return
+        if not self.glow_color: return
+        self.stop_blinking()
         self.is_blinking = True
-        self._toggle_blink(interval)
+        self.blink_interval = interval
+        if not self.blink_paused:
+            self._toggle_blink(interval)
+
+    def pause_blinking(self):
+        """Stop the timer but remember we were blinking"""
+        self.blink_paused = True
+        if self.blink_job:
+            self.clock.cancel(self.blink_job)
+            self.blink_job = None
+
+    def resume_blinking(self):
+        self.blink_paused = False
+        if self.is_blinking and not self.blink_job:
+            self._toggle_blink(self.blink_interval)
+
+    def stop_blinking(self):
+        self.is_blinking = False
+        if self.blink_job:
+            self.clock.cancel(self.blink_job)
+            self.blink_job = None
 
     def _toggle_blink(self, interval):
         if not self.is_blinking: return
         self.blink_state = not self.blink_state
         color = self.glow_color if self.blink_state else self.master["bg"]
         self.itemconfig(self.glow_rect, fill=color)
-        self.after(interval, self._toggle_blink, interval)
+        self.blink_job = self.clock.call_later(interval * self.blink_slowdown, self._toggle_blink, interval)
 
     def _on_click(self, event):
         play_click()
@@ -305,8 +486,11 @@ class RoundedButton(tk.Canvas):
 
 
 class ScrollableFrame(tk.Frame):
-    def __init__(self, parent, bg="#121212", *args, **kwargs):
+    def __init__(self, parent, bg="#121212", *args, clock=None, on_resize=None, on_view_change=None, **kwargs):
         super().__init__(parent, bg=bg, *args, **kwargs)
+        self.clock = clock or TkClock(self)
+        self.on_resize = on_resize # Called with the new width, at most once a frame
+        self.on_view_change = on_view_change # Called after scrolling or resizing, at most once a frame
         
         # Style for Scrollbar
         style = ttk.Style()
@@ -323,13 +507,19 @@ class ScrollableFrame(tk.Frame):
         )
 
         self.canvas = tk.Canvas(self, bg=bg, highlightthickness=0)
-        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview, style="Vertical.TScrollbar")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar, style="Vertical.TScrollbar")
+        self.pinned = True # Follow new text only while the view sits at the bottom
+        self.scroll_job = None
+        self.suspended = False # Window hidden: don't scroll, just remember to
+        self.scroll_owed = False
+        # Configure events arrive for every pixel of a drag; each kind is handled once per frame
+        self.width = None
+        self.resize_job = None
+        self.region_job = None
+        self.view_job = None
         self.scrollable_frame = tk.Frame(self.canvas, bg=bg)
 
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
+        self.scrollable_frame.bind("<Configure>", self._on_frame_configure)
 
         self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw", tags="frame")
         self.canvas.configure(yscrollcommand=self.scrollbar.set)
@@ -344,28 +534,129 @@ class ScrollableFrame(tk.Frame):
         self.scrollbar.pack(side="right", fill="y")
 
     def _on_canvas_configure(self, event):
-        self.canvas.itemconfig("frame", width=event.width)
+        self.width = event.width
+        if self.resize_job is None:
+            self.resize_job = self.clock.call_later(FRAME_MS, self._apply_resize)
+
+    def _apply_resize(self):
+        self.resize_job = None
+        self.canvas.itemconfig("frame", width=self.width)
+        if self.on_resize:
+            self.on_resize(self.width)
+        self._view_changed()
+        self.auto_scroll() # Rewrapping changes heights; stay on the newest message if following it
+
+    def _on_frame_configure(self, event):
+        if self.region_job is None:
+            self.region_job = self.clock.call_later(FRAME_MS, self._update_region)
+
+    def _update_region(self):
+        self.region_job = None
+        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+
+    def _view_changed(self):
+        if self.on_view_change and self.view_job is None:
+            self.view_job = self.clock.call_later(FRAME_MS, self._notify_view)
+
+    def _notify_view(self):
+        self.view_job = None
+        self.on_view_change()
+
+    def visible_span(self):
+        """(top, bottom) of the part of the scrolled frame currently in view"""
+        top = self.canvas.canvasy(0)
+        return top, top + self.canvas.winfo_height()
     
     def _on_mousewheel(self, event):
         self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+        self._update_pinned()
+        self._view_changed()
+
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self._update_pinned()
+        self._view_changed()
+
+    def _update_pinned(self):
+        # Only user scrolling changes this; new content growing below doesn't unpin
+        self.pinned = self.canvas.yview()[1] >= 0.999
         
-    def auto_scroll(self):
-        self.canvas.update_idletasks()
-        self.canvas.yview_moveto(1.0)
+    def auto_scroll(self, force=False):
+        """Scroll to the newest message at the next frame, if the user is following along"""
+        if force:
+            self.pinned = True
+        if not self.pinned or self.scroll_job:
+            return # Reading scrollback, or a scroll is already queued
+        if self.suspended:
+            self.scroll_owed = True
+            return
+        self.scroll_job = self.clock.call_later(FRAME_MS, self._do_scroll)
+
+    def suspend(self):
+        self.suspended = True
+        if self.scroll_job:
+            self.clock.cancel(self.scroll_job)
+            self.scroll_job = None
+            self.scroll_owed = True
+
+    def resume(self):
+        self.suspended = False
+        if self.scroll_owed:
+            self.scroll_owed = False
+            self.auto_scroll()
+
+    def _do_scroll(self):
+        self.scroll_job = None
+        if self.region_job:
+            # Scroll against the current content, not last frame's
+            self.clock.cancel(self.region_job)
+            self._update_region()
+        if self.pinned:
+            self.canvas.yview_moveto(1.0)
+            self._view_changed()
 
 
 class BandersnatchApp:
-    def __init__(self, root):
+    def __init__(self, root, pacing=DEFAULT_PROFILE, clock=None):
         self.root = root
+        self.clock = clock or TkClock(root) # Every delay goes through this, so it can run in virtual time
         self.root.title("Bandersnatch")
         self.root.geometry("900x700")
         self.root.configure(bg="#121212")
 
-        self.typing_speed = 25  # ms
+        self.pacing = get_profile(pacing) # Typing speed and the delays between story steps
+        self.typing = None # (bubble, full text) while a typewriter run is in progress
+        self.typing_job = None
+        self.choices_on_screen = [] # For picking choices with the number keys
+        # Window activity: animations stop while hidden and slow down while unfocused
+        self.visible = True
+        self.focused = True
+        self.cpu_usage = {} # activity -> [cpu seconds, wall seconds]
+        self.cpu_mark = (time.process_time(), time.monotonic())
         self.current_node = None
         self.current_music_type = "normal" 
         self.input_locked = False # Prevent double clicks
         self.chat_history = [] # To save entire interaction
+        self.history_dropped = 0 # Messages trimmed off the front of chat_history
+        self.button_pool = [] # Choice buttons, reused between nodes
+        self.bubble_rows = [] # Row frames in the transcript, oldest first
+        self.rows_dropped = 0 # Rows trimmed off the front of bubble_rows
+        self.checkpoints = CheckpointLog() # One per choice point, for rewinding
+        self.saves = SaveSlots()
+        self.save_slot = None # Slot name the current game saves into
+        self.endings = [] # Endings reached in this save
+        self.telemetry = TelemetryRecorder() # Choice log, written off the UI thread
+        self.telemetry.start()
+        self.telemetry_session = uuid.uuid4().hex[:12]
+        self.choices_shown_at = None # When the current choices appeared
+        self.chosen_at = None # When the player clicked one
+        self.speculations = {} # (label, target) -> Preview for each choice on screen
+        self.speculation_queue = [] # Choices still to be previewed
+        self.speculation_job = None
+        self.prepared_choices = None # (node id, state, choices) from the preview that was taken
+        # Bubble text wraps at bubble_width minus the bubble's padding; both follow the window size
+        self.bubble_width = 500
+        self.layouts = LayoutCache(root, get_font(11), width=self.bubble_width - 2 * 10, clock=self.clock)
         
         # Main Container to hold screens
         self.container = tk.Frame(root, bg="#121212")
@@ -376,13 +667,158 @@ class BandersnatchApp:
         self.game_frame = None
         
         self.setup_title_screen()
+        self.clock.call_idle(self.precompute_layouts)
+
+        # Space/Enter finish the text being typed; 1-9 pick a choice
+        self.root.bind("<space>", self.complete_typing)
+        self.root.bind("<Return>", self.complete_typing)
+        for n in range(1, 10):
+            self.root.bind(str(n), lambda e, i=n - 1: self.choose_by_key(i))
+
+        self.root.bind("<Map>", lambda e: self._on_window_event(e, visible=True))
+        self.root.bind("<Unmap>", lambda e: self._on_window_event(e, visible=False))
+        self.root.bind("<Visibility>", lambda e: self._on_window_event(e, visible=e.state != "VisibilityFullyObscured"))
+        self.root.bind("<FocusIn>", lambda e: self.clock.call_idle(self._check_focus))
+        self.root.bind("<FocusOut>", lambda e: self.clock.call_idle(self._check_focus))
+
+    @property
+    def activity(self):
+        if not self.visible:
+            return "hidden"
+        return "focused" if self.focused else "unfocused"
+
+    def _on_window_event(self, event, visible):
+        # Child widgets carry the root's bindtag too; only the window itself counts
+        if event.widget is self.root:
+            self.set_activity(visible=visible)
+
+    def _check_focus(self):
+        # Focus moving between our own widgets sends Out/In pairs; look at where it ended up
+        try:
+            focused = self.root.focus_get() is not None
+        except (KeyError, tk.TclError):
+            focused = False # e.g. a popup menu has it
+        self.set_activity(focused=focused)
+
+    def set_activity(self, visible=None, focused=None):
+        was = self.activity
+        if visible is not None:
+            self.visible = visible
+        if focused is not None:
+            self.focused = focused
+        now = self.activity
+        if now == was:
+            return
+        self._account_cpu(was)
+
+        slowdown = 1 if now == "focused" else 4
+        for btn in self.button_pool:
+            btn.blink_slowdown = slowdown
+        if now == "hidden":
+            self.suspend_animations()
+        elif was == "hidden":
+            self.resume_animations()
+
+    def suspend_animations(self):
+        for btn in self.button_pool:
+            btn.pause_blinking()
+        if self.game_frame:
+            self.chat_area.suspend()
+        if self.typing_job:
+            # Typed out in full when the window comes back
+            self.clock.cancel(self.typing_job)
+            self.typing_job = None
+
+    def resume_animations(self):
+        for btn in self.button_pool:
+            btn.resume_blinking()
+        if self.game_frame:
+            self.chat_area.resume()
+        if self.typing:
+            self.complete_typing()
+
+    def _account_cpu(self, activity):
+        cpu, wall = time.process_time(), time.monotonic()
+        used = self.cpu_usage.setdefault(activity, [0.0, 0.0])
+        used[0] += cpu - self.cpu_mark[0]
+        used[1] += wall - self.cpu_mark[1]
+        self.cpu_mark = (cpu, wall)
+        TRACER.instant("activity", {"ended": activity, "cpu_s": round(used[0], 4), "wall_s": round(used[1], 3)})
+
+    def cpu_report(self):
+        """CPU use per window activity (focused/unfocused/hidden) since startup"""
+        self._account_cpu(self.activity)
+        return {
+            activity: {"seconds": round(wall, 1), "cpu_percent": round(100.0 * cpu / wall, 2) if wall else None}
+            for activity, (cpu, wall) in self.cpu_usage.items()
+        }
+
+    def cpu_bench(self, seconds, node_id="follow_colin", done=None):
+        """Measure idle CPU on an intense node (blinking choices), focused, unfocused then hidden.
+
+        Hiding is a real withdraw, so the Unmap path is what gets measured;
+        focus can't be taken away from a script reliably, so the unfocused
+        phase sets it directly. Calls done(report) when the three phases are over.
+        """
+        def settle():
+            if self.input_locked or self.typing:
+                self.clock.call_later(100, settle)
+                return
+            self.root.deiconify()
+            self.root.focus_force()
+            self.set_activity(visible=True, focused=True)
+            self.cpu_usage = {}
+            self.cpu_mark = (time.process_time(), time.monotonic())
+            self.clock.call_later(seconds * 1000, unfocus)
+
+        def unfocus():
+            self.set_activity(focused=False)
+            self.clock.call_later(seconds * 1000, hide)
+
+        def hide():
+            self.root.withdraw()
+            self.set_activity(visible=False) # In case the window manager is slow to send Unmap
+            self.clock.call_later(seconds * 1000, finish)
+
+        def finish():
+            report = self.cpu_report()
+            report["node"] = node_id
+            if done:
+                done(report)
+
+        # Straight to the node, without a save slot, so nothing is written
+        reset_state()
+        if self.title_frame:
+            self.title_frame.destroy()
+            self.title_frame = None
+        self._show_game_screen(node_id)
+        self.clock.call_later(100, settle)
+
+    def precompute_layouts(self):
+        """Queue the fixed texts of the loaded chapters to be laid out in idle time"""
+        with STORY.lock:
+            chapters = list(STORY.resident.values())
+        if not chapters:
+            # Nothing played yet: lay out the opening chapter
+            chapters = [STORY.chapter(STORY.chapter_of[STORY.first])]
+        texts = []
+        for nodes, _ in chapters:
+            for node in nodes.values():
+                text = node.get("text", "")
+                variants = [text] if isinstance(text, str) else [v["text"] for v in text]
+                texts.extend(t for t in variants if "{" not in t) # Templated text is laid out when shown
+                texts.extend(node.get("choices", {}))
+        self.layouts.precompute(texts)
 
     def setup_title_screen(self):
         self.title_frame = tk.Frame(self.container, bg="#121212")
         self.title_frame.pack(fill="both", expand=True)
+
+        # Only the slot index is read here; a save's body is loaded when it's picked
+        slots = self.saves.list_slots()
         
-        # Spacer
-        tk.Label(self.title_frame, text="", bg="#121212", height=8).pack()
+        # Spacer (smaller when the slot list needs the room)
+        tk.Label(self.title_frame, text="", bg="#121212", height=3 if slots else 8).pack()
         
         # Title
         tk.Label(
@@ -404,27 +840,35 @@ class BandersnatchApp:
         
         # Buttons Frame
         btn_frame = tk.Frame(self.title_frame, bg="#121212")
-        btn_frame.pack(pady=50)
+        btn_frame.pack(pady=30 if slots else 50)
         
-        save_path = "savegame.json"
-        if os.path.exists(save_path):
-            # Continue Button
-            RoundedButton(
-                btn_frame, 
-                text="CONTINUE INTERACTION", 
-                command=self.continue_game,
-                width=300,
-                height=60,
-                radius=30,
-                bg="#444444",
-                fg="white"
-            ).pack(pady=10)
+        if slots:
+            # One Continue Button per slot
+            for meta in slots:
+                node = (meta.get("current_node") or "start").replace("_", " ")
+                endings = len(meta.get("endings", []))
+                label = f"CONTINUE: {(meta.get('name') or meta['slot']).upper()}"
+                details = f"{node}  ·  " + time.strftime("%b %d %H:%M", time.localtime(meta["timestamp"]))
+                details += f"  ·  {meta.get('messages', 0)} messages"
+                if endings:
+                    details += f"  ·  {endings} ending{'s' if endings != 1 else ''}"
+                RoundedButton(
+                    btn_frame, 
+                    text=label, 
+                    command=lambda slot=meta["slot"]: self.continue_game(slot),
+                    width=420,
+                    height=50,
+                    radius=25,
+                    bg="#444444",
+                    fg="white"
+                ).pack(pady=(8, 0))
+                tk.Label(btn_frame, text=details, font=get_font(9), bg="#121212", fg="#888888").pack()
             
             # New Game Button
             RoundedButton(
                 btn_frame, 
                 text="NEW GAME", 
-                command=self.start_game,
+                command=lambda: self.show_new_game_form(btn_frame, slots),
                 width=300,
                 height=60,
                 radius=30,
@@ -444,35 +888,105 @@ class BandersnatchApp:
                 fg="white"
             ).pack()
 
+    def show_new_game_form(self, btn_frame, slots):
+        """Ask for a name for the new save, and which slot it replaces when they're all taken"""
+        for child in btn_frame.winfo_children():
+            child.destroy()
+
+        tk.Label(btn_frame, text="NAME THIS SAVE", font=get_font(11, bold=True), bg="#121212", fg="#bbbbbb").pack()
+        name_var = tk.StringVar(value=f"Game {len(slots) + 1}")
+        entry = tk.Entry(
+            btn_frame,
+            textvariable=name_var,
+            font=get_font(14),
+            justify="center",
+            bg="#333333",
+            fg="#ffffff",
+            insertbackground="#ffffff",
+            relief="flat",
+            width=24
+        )
+        entry.pack(pady=(5, 15), ipady=6)
+        entry.focus_set()
+        entry.select_range(0, "end")
+
+        def name():
+            return name_var.get().strip() or f"Game {len(slots) + 1}"
+
+        if self.saves.is_full():
+            # Nothing is deleted until the new game is first saved
+            tk.Label(
+                btn_frame,
+                text=f"All {self.saves.max_slots} slots are in use. Overwrite:",
+                font=get_font(10),
+                bg="#121212",
+                fg="#888888"
+            ).pack()
+            for meta in slots:
+                RoundedButton(
+                    btn_frame,
+                    text=(meta.get("name") or meta["slot"]).upper(),
+                    command=lambda slot=meta["slot"]: self.start_game(name(), replaces=slot),
+                    width=420,
+                    height=40,
+                    radius=20,
+                    bg="#444444",
+                    fg="white"
+                ).pack(pady=3)
+        else:
+            RoundedButton(
+                btn_frame,
+                text="START",
+                command=lambda: self.start_game(name()),
+                width=300,
+                height=60,
+                radius=30,
+                bg="#333333",
+                fg="white"
+            ).pack()
+            entry.bind("<Return>", lambda e: self.start_game(name()))
+
+        back = tk.Label(btn_frame, text="Back", font=get_font(10), bg="#121212", fg="#888888", cursor="hand2")
+        back.pack(pady=(10, 0))
+        back.bind("<Button-1>", lambda e: self.back_to_title())
+
+    def back_to_title(self):
+        if self.title_frame:
+            self.title_frame.destroy()
+        self.setup_title_screen()
+
+    @traced("save_game")
     def save_game(self):
         """Save current progress to JSON"""
-        if not self.current_node: return
+        if not self.current_node or not self.save_slot: return
         data = {
             "current_node": self.current_node,
             "state": state,
-            "chat_history": self.chat_history
+            "chat_history": self.chat_history,
+            "endings": self.endings
         }
         try:
-            with open("savegame.json", "w") as f:
-                json.dump(data, f)
+            self.saves.write(self.save_slot, data, endings=self.endings)
         except Exception as e:
             print(f"Error saving game: {e}")
 
-    def continue_game(self):
-        """Load progress and start"""
+    def continue_game(self, slot):
+        """Load progress from a save slot and start"""
         try:
-            if os.path.exists("savegame.json"):
-                with open("savegame.json", "r") as f:
-                    data = json.load(f)
+            if slot:
+                data = self.saves.read(slot)
+                self.save_slot = slot
+                self.telemetry_session = uuid.uuid4().hex[:12]
                     
                 # Restore state
-                global state
                 # Ensure all keys from save are restored
                 for k, v in data.get("state", {}).items():
                     state[k] = v
                 
                 # Restore history
                 self.chat_history = data.get("chat_history", [])
+                self.history_dropped = 0
+                self.endings = data.get("endings", [])
                 
                 # Close title and start
                 if self.title_frame:
@@ -480,7 +994,7 @@ class BandersnatchApp:
                     self.title_frame = None
                 
                 # Add a brief delay before showing game
-                self.root.after(1000, lambda: self._show_game_screen(
+                self.clock.call_later(self.pacing.continue_ms, lambda: self._show_game_screen(
                     node_id=data.get("current_node", "start"),
                     history=self.chat_history
                 ))
@@ -493,16 +1007,34 @@ class BandersnatchApp:
         # Do not pack yet, waiting for transition
         
         # UI Components within Game Frame
-        self.chat_area = ScrollableFrame(self.game_frame, bg="#0d1117") 
+        self.chat_area = ScrollableFrame(
+            self.game_frame, bg="#0d1117", clock=self.clock,
+            on_resize=self.resize_bubbles, on_view_change=self.reflow_visible
+        )
         self.chat_area.pack(expand=True, fill="both")
+        # Clicking the conversation finishes the text being typed
+        self.chat_area.canvas.bind("<Button-1>", self.complete_typing, add="+")
 
         self.button_frame = tk.Frame(self.game_frame, bg="#121212", pady=15)
         self.button_frame.pack(fill="x")
+        self.button_pool = []
         
         # Volume control in bottom right
         self.volume_frame = tk.Frame(self.game_frame, bg="#121212")
         self.volume_frame.place(relx=1.0, rely=1.0, anchor="se", x=-20, y=-20)
         
+        # Rewind icon (clickable): go back to an earlier choice
+        self.rewind_icon = tk.Label(
+            self.volume_frame,
+            text="⟲",
+            bg="#121212",
+            fg="#ffffff",
+            font=("Segoe UI", 12),
+            cursor="hand2"
+        )
+        self.rewind_icon.pack(side="left", padx=5)
+        self.rewind_icon.bind("<Button-1>", self.show_rewind_menu)
+
         # Volume icon (clickable)
         self.volume_icon = tk.Label(
             self.volume_frame,
@@ -513,6 +1045,18 @@ class BandersnatchApp:
             cursor="hand2"
         )
         self.volume_icon.pack(side="left", padx=5)
+
+        # Pacing (clickable): pick how fast the story plays out
+        self.pacing_icon = tk.Label(
+            self.volume_frame,
+            text="»",
+            bg="#121212",
+            fg="#ffffff",
+            font=("Segoe UI", 12),
+            cursor="hand2"
+        )
+        self.pacing_icon.pack(side="left", padx=5)
+        self.pacing_icon.bind("<Button-1>", self.show_pacing_menu)
         self.volume_icon.bind("<Button-1>", lambda e: self.toggle_volume_slider())
         
         # Volume slider (initially hidden)
@@ -533,6 +1077,19 @@ class BandersnatchApp:
         self.volume_slider.set(30)  # Default 30%
         self.slider_visible = False  # Start hidden
 
+    def show_pacing_menu(self, event):
+        """Pop up the pacing profiles"""
+        menu = tk.Menu(self.root, tearoff=0, bg="#333333", fg="#ffffff", activebackground="#555555")
+        choice = tk.StringVar(menu, value=self.pacing.name)
+        for name in PROFILES:
+            menu.add_radiobutton(label=name.capitalize(), value=name, variable=choice,
+                                 command=lambda n=name: self.set_pacing(n))
+        menu.tk_popup(event.x_root, event.y_root)
+
+    def set_pacing(self, name):
+        # Takes effect from the next character typed
+        self.pacing = get_profile(name)
+
     def toggle_volume_slider(self):
         """Show/hide volume slider"""
         if self.slider_visible:
@@ -552,25 +1109,18 @@ class BandersnatchApp:
             except:
                 pass
 
-    def start_game(self):
-        # Clear existing save if starting fresh
-        if os.path.exists("savegame.json"):
-            try:
-                os.remove("savegame.json")
-            except:
-                pass
+    def start_game(self, name=None, replaces=None):
+        # New games get their own slot; older saves stay available from the title screen,
+        # and a slot picked to be overwritten goes only once this game has saved
+        self.save_slot = self.saves.new_slot(name, replaces=replaces)
+        self.endings = []
+        self.telemetry_session = uuid.uuid4().hex[:12]
         
-        # Reset state to default
-        global state
-        state["cereal"] = None
-        state["music"] = None
-        state["offer"] = None
-        state["colin_follow"] = False
-        state["mohan_counter"] = 0
-        state["inventory"] = []
-        # Keep volume setting
+        # Reset state to default (keeps volume setting)
+        reset_state()
         
         self.chat_history = [] 
+        self.history_dropped = 0
 
         # Destroy title screen
         if self.title_frame:
@@ -578,11 +1128,14 @@ class BandersnatchApp:
             self.title_frame = None
         
         # Add a brief delay before showing game (fade-like effect)
-        self.root.after(1500, self._show_game_screen)
+        self.clock.call_later(self.pacing.start_ms, self._show_game_screen)
     
     def _show_game_screen(self, node_id="start", history=None):
         # Setup and show game
         self.setup_game_ui()
+        self.bubble_rows = []
+        self.rows_dropped = 0
+        self.checkpoints.reset(state)
         self.game_frame.pack(fill="both", expand=True)
         
         # Restore chat history if any
@@ -598,15 +1151,41 @@ class BandersnatchApp:
         self.load_node(node_id, resume=(history is not None))
 
     def clear_buttons(self):
-        for widget in self.button_frame.winfo_children():
-            widget.destroy()
+        # Hide pooled buttons rather than destroying them; show_choices reuses them
+        for btn in self.button_pool:
+            btn.stop_blinking()
+            btn.pack_forget()
+
+    def get_button(self, index, text, command, glow_color=None):
+        """Return pooled choice button number `index`, reconfigured for a new choice"""
+        if index < len(self.button_pool):
+            btn = self.button_pool[index]
+            btn.reconfigure(text, command, glow_color=glow_color)
+        else:
+            btn = RoundedButton(
+                self.button_frame,
+                text=text,
+                command=command,
+                bg="#333333", 
+                fg="#ffffff",
+                hover_bg="#555555",
+                glow_color=glow_color,
+                clock=self.clock
+            )
+            btn.blink_slowdown = 1 if self.activity == "focused" else 4
+            btn.blink_paused = not self.visible
+            self.button_pool.append(btn)
+        return btn
 
-    def create_bubble(self, text, is_user=False, add_to_history=True):
+    @traced("create_bubble")
+    def create_bubble(self, text, is_user=False, add_to_history=True, final_text=None):
         if add_to_history and text.strip():
             self.chat_history.append({"text": text, "is_user": is_user})
             
         row = tk.Frame(self.chat_area.scrollable_frame, bg="#0d1117", pady=2, padx=10) # Reduced row spacing
         row.pack(fill="x")
+        self.bubble_rows.append(row)
+        self.trim_transcript()
         
         if is_user:
             bg_color = "#d9fdd3"
@@ -620,52 +1199,137 @@ class BandersnatchApp:
         bubble = RoundedBubble(
             row,
             text=text,
-            max_width=500,
+            max_width=self.bubble_width,
             bg_color=bg_color,
             fg_color=fg_color,
-            is_user=is_user
+            is_user=is_user,
+            layout=self.layouts.get(final_text if final_text is not None else text),
+            final_text=final_text
         )
         bubble.pack(side="right" if is_user else "left", anchor=align)
+        row.bubble = bubble
+        bubble.bind("<Button-1>", self.complete_typing)
+        row.bind("<Button-1>", self.complete_typing)
         
-        self.chat_area.auto_scroll()
+        # Picking a choice brings the view back to the conversation
+        self.chat_area.auto_scroll(force=is_user)
         return bubble
 
+    def resize_bubbles(self, chat_width):
+        """Follow the window size: rewrap what's in view now, the rest as it scrolls into view"""
+        width = int(chat_width * BUBBLE_WIDTH_RATIO) // BUBBLE_WIDTH_STEP * BUBBLE_WIDTH_STEP
+        width = max(MIN_BUBBLE_WIDTH, min(MAX_BUBBLE_WIDTH, width))
+        if width == self.bubble_width:
+            return
+        self.bubble_width = width
+        self.layouts.width = width - 2 * 10
+        self.reflow_visible()
+
+    def reflow_visible(self):
+        """Rewrap the bubbles in view that were laid out at an older width.
+
+        Bubbles out of view stay as they are; their stale max_width marks
+        them for reflow once they're scrolled to.
+        """
+        top, bottom = self.chat_area.visible_span()
+        for row in reversed(self.bubble_rows): # Newest first: the view is usually at the bottom
+            height = row.winfo_height()
+            if height <= 1:
+                continue # Not laid out yet; it was created at the current width
+            y = row.winfo_y()
+            if y > bottom:
+                continue
+            if y + height < top:
+                break
+            bubble = row.bubble
+            if bubble.max_width != self.bubble_width:
+                bubble.reflow(self.bubble_width, self.layouts.get(bubble.final_text))
+
+    def memory_counters(self):
+        """Sizes of the app's own collections, for memory sampling"""
+        return {
+            "chat_history": len(self.chat_history),
+            "bubble_rows": len(self.bubble_rows),
+            "checkpoints": len(self.checkpoints.checkpoints),
+            "button_pool": len(self.button_pool),
+            "layout_entries": len(self.layouts.entries),
+            "telemetry_dropped": self.telemetry.dropped
+        }
+
+    def trim_transcript(self):
+        """Keep long sessions (kiosks looping the story) from growing without bound"""
+        excess = len(self.bubble_rows) - MAX_TRANSCRIPT
+        if excess > 0:
+            for row in self.bubble_rows[:excess]:
+                row.destroy()
+            del self.bubble_rows[:excess]
+            self.rows_dropped += excess
+        excess = len(self.chat_history) - MAX_TRANSCRIPT
+        if excess > 0:
+            del self.chat_history[:excess]
+            self.history_dropped += excess
+
+    @traced("animate_text")
     def animate_text(self, bubble_widget, full_text, index=0):
-        if index <= len(full_text):
+        self.typing_job = None
+        if index == 0:
+            self.typing = (bubble_widget, full_text)
+            if not self.pacing.char_ms:
+                index = len(full_text) # No typewriter: show it whole
+            elif not self.visible:
+                return # Nobody's watching; typed out in full when the window comes back
             # Start typing sound once at the beginning
-            if index == 0:
+            if self.pacing.sound:
                 play_type()
-            
+
+        if index <= len(full_text):
             current_text = full_text[:index]
             bubble_widget.update_text(current_text)
             self.chat_area.auto_scroll()
-            self.root.after(50, self.animate_text, bubble_widget, full_text, index+1)
+            self.typing_job = self.clock.call_later(self.pacing.char_ms, self.animate_text, bubble_widget, full_text, index+1)
         else:
+            self.typing = None
             # Stop typing sound when animation completes (now safe with pygame)
             stop_type()
             # Add final text to history after typing and save
             self.chat_history.append({"text": full_text, "is_user": False})
+            self.trim_transcript()
             self.save_game()
             self.show_choices()
 
-    def load_node(self, node_id, resume=False):
+    def complete_typing(self, event=None):
+        """Finish the current typewriter run at once"""
+        if not self.typing:
+            return
+        if self.typing_job:
+            self.clock.cancel(self.typing_job)
+        bubble_widget, full_text = self.typing
+        bubble_widget.update_text(full_text)
+        self.chat_area.auto_scroll()
+        self.animate_text(bubble_widget, full_text, len(full_text) + 1)
+
+    def choose_by_key(self, index):
+        if not self.input_locked and index < len(self.choices_on_screen):
+            choice = self.choices_on_screen[index]
+            play_click()
+            self.transition(choice.label, choice.target, choice.apply)
+
+    @traced("load_node")
+    def load_node(self, node_id, resume=False, preview=None):
         self.current_node = node_id
         
-        if node_id not in STORY_NODES:
+        if node_id not in COMPILED_NODES:
             self.create_bubble("End of Line.")
             self.clear_buttons()
-            RoundedButton(
-                self.button_frame, 
-                text="Restart", 
-                command=lambda: self.restart_game(),
-                bg="#333333", fg="white"
-            ).pack(pady=10)
+            self.get_button(0, "Restart", lambda: self.restart_game()).pack(pady=10)
             return
 
-        node = STORY_NODES[node_id]
+        node = COMPILED_NODES[node_id]
+        # Read the chapters this node's choices lead into while the player reads
+        STORY.prefetch(node_id)
         
         # Dynamic Music Switch
-        music_type = node.get("music", "normal")
+        music_type = node.music
         if music_type != self.current_music_type:
             start_background_music(music_type)
             self.current_music_type = music_type
@@ -675,25 +1339,53 @@ class BandersnatchApp:
             self.show_choices()
             return
             
-        # Resolve text
-        text = node["text"]
-        if callable(text):
-            text = text()
+        # A preview only holds if the state is still what it was worked out from
+        if preview is not None and preview.before != state:
+            preview = None
+
+        # Apply the node's state effects, then resolve its (possibly templated) text
+        if node.enter:
+            node.enter(state)
+        if node.ending and node.ending not in self.endings:
+            self.endings.append(node.ending)
+        if preview is not None:
+            text = preview.text
+            self.prepared_choices = (node_id, preview.after, preview.choices)
+        else:
+            text = node.render(state)
         
         self.clear_buttons()
         self.input_locked = True # Lock input while typing
         
         # Create empty bubble and start typing animation
-        bubble = self.create_bubble("", is_user=False)
+        bubble = self.create_bubble("", is_user=False, final_text=text)
         self.animate_text(bubble, text)
 
-    def show_choices(self):
+    @traced("show_choices")
+    def show_choices(self, checkpoint=True):
         self.input_locked = False # Unlock input
-        node = STORY_NODES[self.current_node]
-        is_intense = node.get("music") == "intense"
+        node = COMPILED_NODES[self.current_node]
+        if checkpoint:
+            last_text = self.chat_history[-1]["text"] if self.chat_history else self.current_node
+            self.checkpoints.take(
+                state,
+                self.current_node,
+                label=last_text.strip().split("\n")[0][:40],
+                # Counted from the start of the session, so trimming doesn't shift them
+                history_len=self.history_dropped + len(self.chat_history),
+                rows=self.rows_dropped + len(self.bubble_rows)
+            )
+        is_intense = node.music == "intense"
+        self.clear_buttons()
         
-        choice_items = list(node["choices"].items())
-        for i, (label, next_node_id) in enumerate(choice_items):
+        prepared, self.prepared_choices = self.prepared_choices, None
+        if prepared and prepared[0] == self.current_node and prepared[1] == state:
+            choices = prepared[2]
+        else:
+            choices = node.available_choices(state)
+
+        self.choices_on_screen = choices
+        for i, choice in enumerate(choices):
             # Blue Pill / Red Pill Effect for Intense Scenes
             glow = None
             if is_intense:
@@ -701,13 +1393,10 @@ class BandersnatchApp:
                 elif i == 1: glow = "#4444ff" # Blue
                 else: glow = "#ffffff" # White for any others
             
-            btn = RoundedButton(
-                self.button_frame,
-                text=label,
-                command=lambda l=label, n=next_node_id: self.transition(l, n),
-                bg="#333333", 
-                fg="#ffffff",
-                hover_bg="#555555",
+            btn = self.get_button(
+                i,
+                text=choice.label,
+                command=lambda c=choice: self.transition(c.label, c.target, c.apply),
                 glow_color=glow
             )
             btn.pack(pady=5)
@@ -715,356 +1404,156 @@ class BandersnatchApp:
             if is_intense and glow:
                 btn.start_blinking(400) # Fast blinking for intensity
 
-    def transition(self, label, next_node_id):
+        self.choices_shown_at = self.clock.now()
+        # Lay out text from chapters prefetched for these choices while the player decides
+        self.precompute_layouts()
+        self.speculate(choices)
+
+    def speculate(self, choices):
+        """Prepare every node the choices on screen lead to, one per idle slice"""
+        self.cancel_speculation()
+        self.speculation_queue = list(choices)
+        self.speculation_job = self.clock.call_idle(self._speculate_next)
+
+    def _speculate_next(self):
+        self.speculation_job = None
+        if not self.speculation_queue:
+            return
+        choice = self.speculation_queue.pop(0)
+        preview = preview_choice(choice, state)
+        if preview.node is not None:
+            self.layouts.get(preview.text) # Measured now, so the bubble opens at its final size
+            warm_music(preview.node.music)
+            STORY.prefetch(choice.target) # And the chapters one step further on
+        self.speculations[(choice.label, choice.target)] = preview
+        if self.speculation_queue:
+            self.speculation_job = self.clock.call_later(15, self._speculate_after_events)
+
+    def _speculate_after_events(self):
+        # Let pending events run before the next preview
+        self.speculation_job = self.clock.call_idle(self._speculate_next)
+
+    def cancel_speculation(self):
+        if self.speculation_job:
+            self.clock.cancel(self.speculation_job)
+            self.speculation_job = None
+        self.speculation_queue = []
+        self.speculations = {}
+
+    def transition(self, label, next_node_id, effect=None):
         if self.input_locked:
             return
             
         self.input_locked = True # Lock immediately
+        self.chosen_at = self.clock.now()
         
         # Delay the visual response to separate it from the click sound
         # Sound plays at T=0 (on click)
-        # User Bubble appears at T=400ms
-        self.root.after(400, lambda: self._finish_transition(label, next_node_id))
+        # User Bubble appears at T=echo_ms (400ms at normal pacing)
+        self.clock.call_later(self.pacing.echo_ms, lambda: self._finish_transition(label, next_node_id, effect))
+
+    def _finish_transition(self, label, next_node_id, effect=None):
+        # Choice effects (set/inc/add on state) take hold before the next node loads
+        if effect:
+            effect(state)
+        preview = self.speculations.get((label, next_node_id))
+        self.cancel_speculation() # The other branches' work is just dropped
+
+        if self.choices_shown_at is not None:
+            self.telemetry.record(
+                self.telemetry_session,
+                self.current_node,
+                label,
+                next_node_id,
+                self.chosen_at - self.choices_shown_at
+            )
 
-    def _finish_transition(self, label, next_node_id):
         # User Bubble
         self.create_bubble(label, is_user=True)
         
         if next_node_id == "quit":
             self.root.quit()
         else:
-            # Game Response appears at T=400ms + 800ms
-            self.root.after(800, lambda: self.load_node(next_node_id))
+            # Game Response appears at T=echo_ms + reply_ms (400ms + 800ms at normal pacing)
+            self.clock.call_later(self.pacing.reply_ms, lambda: self.load_node(next_node_id, preview=preview))
+
+    def show_rewind_menu(self, event):
+        """Pop up a menu of earlier choice points"""
+        if self.input_locked or len(self.checkpoints.checkpoints) < 2:
+            return
+        menu = tk.Menu(self.root, tearoff=0, bg="#333333", fg="#ffffff", activebackground="#555555")
+        # Newest first, skipping the choice currently on screen
+        for cp in reversed(self.checkpoints.checkpoints[-16:-1]):
+            menu.add_command(label=cp.label, command=lambda c=cp: self.rewind_to(c))
+        menu.tk_popup(event.x_root, event.y_root)
+
+    def rewind_to(self, checkpoint):
+        """Go back to an earlier choice point, restoring state and trimming the transcript"""
+        if self.input_locked:
+            return
+        self.checkpoints.rewind(state, checkpoint)
+
+        keep_rows = max(0, checkpoint.rows - self.rows_dropped)
+        for row in self.bubble_rows[keep_rows:]:
+            row.destroy()
+        del self.bubble_rows[keep_rows:]
+        del self.chat_history[max(0, checkpoint.history_len - self.history_dropped):]
+
+        self.current_node = checkpoint.node_id
+        music_type = COMPILED_NODES[self.current_node].music
+        if music_type != self.current_music_type:
+            start_background_music(music_type)
+            self.current_music_type = music_type
+
+        self.show_choices(checkpoint=False)
+        self.chat_area.auto_scroll(force=True)
+        self.save_game()
 
     def restart_game(self):
         # Clear chat UI and history
         self.chat_history = []
-        for widget in self.chat_area.scrollable_frame.winfo_children():
-            widget.destroy()
+        self.history_dropped = 0
+        for row in self.bubble_rows:
+            row.destroy()
+        self.bubble_rows = []
+        self.rows_dropped = 0
+        self.checkpoints.reset(state)
         
         # We don't necessarily reset 'state' here as some choices might persist in Bandersnatch logic
         # but for a clean 'Restart', we should at least clear the visible history.
         self.load_node("start")
 
 
-# Story Data (Placeholder for now)
-STORY_NODES = {
-    "start": {
-        "text": "July 9th, 1984.\n\nYou wake up. The morning light filters through the curtains. It's a big day for you at Tuckersoft.",
-        "choices": {
-            "Wake Up": "cereal",
-        }
-    },
-    "cereal": {
-        "text": "You walk into the kitchen. Your dad is rustling the newspaper.\n\nStefan, what do you want for breakfast?",
-        "choices": {
-            "Kellogg's Frosties": "bus_frosties",
-            "Quaker Sugar Puffs": "bus_puffs"
-        }
-    },
-    "bus_frosties": {
-        "text": "You crunch on the Frosties. Sweet, predictable power. You catch the bus to Tuckersoft.",
-        "choices": {
-            "Pick Music": "music_selection"
-        }
-    },
-    "bus_puffs": {
-        "text": "Sugar Puffs. The rush hits you. You catch the bus to Tuckersoft.",
-        "choices": {
-            "Pick Music": "music_selection"
-        }
-    },
-    "music_selection": {
-        "text": "You put on your headphones. The world outside is gray. You need a soundtrack.",
-        "choices": {
-            "Now That's What I Call Music": "music_now",
-            "Thompson Twins": "music_thompson"
-        }
-    },
-    "music_now": {
-        "text": "'Here Comes The Rain' plays. A synth-pop anthem for a gray sky.",
-        "choices": {
-            "Arrive at Tuckersoft": "meet_tucker"
-        }
-    },
-    "music_thompson": {
-        "text": "'Hold Me Now' plays. Sentimental. Maybe too sentimental.",
-        "choices": {
-            "Arrive at Tuckersoft": "meet_tucker"
-        }
-    },
-    "meet_tucker": {
-        "text": "You arrive at Tuckersoft. Mohan Tucker is impressed by your demo.\n\n'We want to publish it properly. Team, office, the works. Will you do it?'",
-        "choices": {
-            "Accept Offer": "offer_accept",
-            "Refuse Offer": "offer_refuse"
-        }
-    },
-    "offer_accept": {
-        "text": "You accept. The team takes over. The vision is diluted. \n\nFive months later, Bandersnatch is released to mediocre reviews (0/5 Stars). a 'rushed job'.\n\nDEAD END.",
-        "choices": {
-            "Try Again": "meet_tucker"
-        }
-    },
-    "offer_refuse": {
-        "text": "You refuse. 'I need to do this myself,' you say.\n\nTucker looks stunned but agrees. 'Okay, deliver it by September 12th.' \n\nYou leave.",
-        "choices": {
-            "Visit Therapist": "therapist_mom"
-        }
-    },
-    "therapist_mom": {
-        "text": "Dr. Haynes office. She asks about your past. \n\n'Do you want to talk about your mother?'",
-        "music": "intense",
-        "choices": {
-            "Yes": "mom_yes",
-            "No": "mom_no"
-        }
-    },
-    "mom_no": {
-        "text": "'We can't make progress if you're not honest, Stefan.'",
-        "choices": {
-            "Okay, Talk": "mom_yes",
-            "Refuse": "mom_no_persist"
-        }
-    },
-    "mom_no_persist": {
-        "text": "The session ends early.",
-        "choices": {
-            "Go to Record Store": "record_store"
-        }
-    },
-    "mom_yes": {
-        "text": "You talk about the rabbit. The train. The delay. Her death.\n\nIt still hurts.",
-        "music": "intense",
-        "choices": {
-            "Go to Record Store": "record_store"
-        }
-    },
-    "record_store": {
-        "text": "You need inspiration. Which vinyl do you buy?",
-        "choices": {
-            "The Bermuda Triangle": "vinyl_bermuda",
-            "Phaedra": "vinyl_phaedra"
-        }
-    },
-    "vinyl_bermuda": {
-        "text": "Bermuda Triangle. Mysterious. Just like the code.",
-        "choices": {
-            "Work on Game": "dad_lunch"
-        }
-    },
-    "vinyl_phaedra": {
-        "text": "Phaedra. Electronic. Tangerine Dream. Perfect for coding.",
-        "choices": {
-            "Work on Game": "dad_lunch"
-        }
-    },
-    "dad_lunch": {
-        "text": "You're working. Dad interrupts. 'Lunch time, Stefan.'\n\nYou're in the zone. He's ruining it.",
-        "choices": {
-            "Throw Tea on Computer": "lunch_tea",
-            "Shout at Dad": "lunch_shout"
-        }
-    },
-    "lunch_tea": {
-        "text": "You snap. The tea flies. The computer fizzes and dies.\n\nYears of work lost.\n\nDEAD END.",
-        "music": "intense",
-        "choices": {
-            "Try Again": "dad_lunch"
-        }
-    },
-    "lunch_shout": {
-        "text": "You scream at him. He backs off, hurt. \n\nHe takes you to Dr. Haynes again the next day.",
-        "choices": {
-            "Go to Clinic": "clinic_colin"
-        }
-    },
-    "clinic_colin": {
-        "text": "Outside the clinic, you see Colin walking away.",
-        "choices": {
-            "See Dr. Haynes": "visit_haynes",
-            "Follow Colin": "follow_colin"
-        }
-    },
-    "visit_haynes": {
-        "text": "You see Dr. Haynes. She increases your dosage.\n\n'Take them, Stefan. They help.'",
-        "music": "intense",
-        "choices": {
-            "Take Pills": "pills_take",
-            "Flush Pills": "pills_flush"
-        }
-    },
-    "pills_take": {
-        "text": "You take the pills. The world stops spinning. The game releases on time.\n\n2.5/5 Stars. 'Soulless', say the reviews.\n\nDEAD END.",
-        "choices": {
-            "Try Again": "clinic_colin"
-        }
-    },
-    "pills_flush": {
-        "text": "The pills swirl down the toilet. You are in control.\n\nBut the deadline looms.",
-        "choices": {
-            "Work (Frustrated)": "frustrated_choice"
-        }
-    },
-    "follow_colin": {
-        "text": "You follow Colin to his flat. Reality feels... thin here.\n\n'Offer you something to expand the mind?' he asks.",
-        "music": "intense",
-        "choices": {
-            "Take LSD": "lsd_yes",
-            "Refuse": "lsd_no"
-        }
-    },
-    "lsd_no": {
-        "text": "You refuse. Colin spikes your tea anyway. The walls begin to breathe.",
-        "music": "intense",
-        "choices": {
-            "Listen to Colin": "colin_balcony"
-        }
-    },
-    "lsd_yes": {
-        "text": "You accept. The world melts. Colin talks about timelines. PAC-MAN. Control.",
-        "music": "intense",
-        "choices": {
-            "Listen to Colin": "colin_balcony"
-        }
-    },
-    "colin_balcony": {
-        "text": "Balcony edge. 'One of us has to jump,' Colin says. 'To show it doesn't matter.'\n\nWho jumps?",
-        "music": "intense",
-        "choices": {
-            "Stefan": "jump_stefan",
-            "Colin": "jump_colin"
-        }
-    },
-    "jump_stefan": {
-        "text": "You step off. Gravity takes over. \n\nThe game is finished without you. \n\nDEAD END.",
-        "music": "intense",
-        "choices": {
-            "Try Again": "colin_balcony"
-        }
-    },
-    "jump_colin": {
-        "text": "Colin steps off. He creates a mess.\n\nYou wake up. Was it a dream?\n\nBack to work.",
-        "music": "intense",
-        "choices": {
-            "Work (Frustrated)": "frustrated_choice"
-        }
-    },
-    "frustrated_choice": {
-        "text": "The code is broken. The bugs are crawling under the screen.\n\nHow do you react?",
-        "music": "intense",
-        "choices": {
-            "Hit Desk": "item_bed",
-            "Destroy Computer": "destroy_pc"
-        }
-    },
-    "destroy_pc": {
-        "text": "You smash the computer. It's over.\n\nDEAD END.",
-        "choices": {
-            "Try Again": "frustrated_choice"
-        }
-    },
-    "item_bed": {
-        "text": "You hit the desk. You need comfort. You go to your room.\n\nWhat do you pick up?",
-        "choices": {
-            "Book (Bandersnatch)": "dad_safe",
-            "Family Photo": "mirror_travel"
-        }
-    },
-    "dad_safe": {
-        "text": "You find the book. And something else... keys to the safe.",
-        "choices": {
-            "Enter Password": "password_entry"
-        }
-    },
-    "mirror_travel": {
-        "text": "You look at the photo. The mirror calls to you. You travel back to the train station.",
-        "choices": {
-            "Go with Mom?": "train_death"
-        }
-    },
-    "train_death": {
-        "text": "You go with her. The train crashes.\n\nStefan dies in the chair in the present day.",
-        "choices": {
-            "Restart": "start"
-        }
-    },
-    "password_entry": {
-        "text": "The safe needs a password.",
-        "choices": {
-            "PAX": "pass_pax",
-            "TOY": "pass_toy",
-            "JFD": "pass_jfd"
-        }
-    },
-    "pass_pax": {
-        "text": "The monster PAX appears! It's a hallucination. You wake up.",
-        "music": "intense",
-        "choices": {
-            "Work": "symbol_choice"
-        }
-    },
-    "pass_jfd": {
-        "text": "Jerome F. Davies appears. He laughs. Madness.",
-        "music": "intense",
-        "choices": {
-            "Work": "symbol_choice"
-        }
-    },
-    "pass_toy": {
-        "text": "You find the rabbit. You place it under the bed.\n\nTimeline corrected?",
-        "choices": {
-            "Wake Up": "start"
-        }
-    },
-    "symbol_choice": {
-        "text": "The symbol is everywhere. You are not in control.\n\nKill Dad?",
-        "music": "intense",
-        "choices": {
-            "Back Off": "frustrated_choice",
-            "Kill Dad": "kill_dad"
-        }
-    },
-    "kill_dad": {
-        "text": "You did it. He's dead.\n\nWhat now?",
-        "music": "intense",
-        "choices": {
-            "Bury Him": "bury_dad",
-            "Chop Him Up": "chop_dad"
-        }
-    },
-    "bury_dad": {
-        "text": "You bury him. The dog finds him later. Jail.",
-        "music": "intense",
-        "choices": {
-            "Restart": "start"
-        }
-    },
-    "chop_dad": {
-        "text": "You chop him up. Grim. But effective.\n\nThe game is released. 5/5 Stars. ",
-        "music": "intense",
-        "choices": {
-            "Future Ending": "pearl_ending"
-        }
-    },
-    "pearl_ending": {
-        "text": "Years later, Pearl Ritchie remakes the game. She finds the bugs...",
-        "music": "intense",
-        "choices": {
-            "Destroy Computer": "pearl_destroy"
-        }
-    },
-    "pearl_destroy": {
-        "text": "She destroys the computer. History repeats itself.\n\nEnd of Line.",
-        "music": "intense",
-        "choices": {
-            "Restart": "start"
-        }
-    }
-}
-
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bandersnatch")
+    parser.add_argument("--trace", metavar="PATH", help="record a Chrome trace-event file of UI timings")
+    parser.add_argument("--stall-ms", type=float, default=50, help="report mainloop gaps longer than this (with --trace)")
+    parser.add_argument("--pacing", choices=list(PROFILES), default=DEFAULT_PROFILE, help="typing speed and delays between story steps")
+    parser.add_argument("--turbo", action="store_true", help="no delays or typing sound, for testing")
+    parser.add_argument("--cpu-report", action="store_true", help="print CPU use while focused, unfocused and hidden on exit")
+    parser.add_argument("--cpu-bench", type=float, metavar="SECONDS", help="idle on a blinking intense node for SECONDS focused, unfocused and hidden each; print CPU use and exit")
+    parser.add_argument("--memwatch", metavar="PATH", default=os.environ.get(MEMWATCH_ENV), help="append memory samples (JSON lines) to PATH")
+    parser.add_argument("--memwatch-interval", type=float, default=5000, help="ms between memory samples")
+    args = parser.parse_args()
+
+    enable_from_env()
+    if args.trace:
+        TRACER.enable(args.trace, stall_ms=args.stall_ms)
+
     root = tk.Tk()
-    app = BandersnatchApp(root)
+    TRACER.install_tk_hooks(root)
+    app = BandersnatchApp(root, pacing=TURBO.name if args.turbo else args.pacing)
+    if args.memwatch:
+        MemoryWatch(root, args.memwatch, args.memwatch_interval, clock=app.clock, counters=app.memory_counters).start()
+    if args.cpu_bench:
+        def bench_done(report):
+            print(json.dumps(report, indent=2))
+            root.quit()
+        app.cpu_bench(args.cpu_bench, done=bench_done)
     root.mainloop()
+    if args.cpu_report:
+        print(json.dumps(app.cpu_report(), indent=2))
+    app.telemetry.stop()
+    app.layouts.save()
+    TRACER.write()
 
@@ -0,0 +1,242 @@
+"""Packed asset bundle for sounds and music, read through mmap.
+
+Layout of assets.bundle:
+
+    b"BSAB"  magic
+    u32      format version (1)
+    u32      index length
+    ...      index: UTF-8 JSON {name: {"offset", "size", "mtime_ns", "pcm"}}
+    ...      asset files, each starting on a 16-byte boundary
+
+"pcm" is [offset, size, rate, bits, channels] of a WAV's sample data, so
+a mixer opened at the same format can take the samples straight from
+the mapping. Assets are handed out as memoryviews or file-like readers
+over the map, never copied into Python bytes, and every process playing
+from the same bundle shares its pages in the OS page cache.
+
+The bundle and the loose files (click.wav, ...) live in the game's own
+directory. When pygame is available the app rebuilds the bundle as it
+loads its sounds, if one of the files is newer or missing from it:
+
+    python assets.py build [files...]
+    python assets.py list
+"""
+import io
+import json
+import mmap
+import os
+import struct
+
+# Next to the game, wherever it's run from
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLE_FILE = os.path.join(ASSET_DIR, "assets.bundle")
+MAGIC = b"BSAB"
+VERSION = 1
+ALIGN = 16
+DEFAULT_ASSETS = [os.path.join(ASSET_DIR, name) for name in ("click.wav", "typing.wav", "background.wav", "intense.wav")]
+
+
+class AssetBundleError(ValueError):
+    """Raised for files that aren't a readable asset bundle"""
+
+
+def _wav_pcm(data):
+    """(offset, size, rate, bits, channels) of a PCM WAV's sample data, or None"""
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    pos = 12
+    fmt = None
+    while pos + 8 <= len(data):
+        chunk_id = bytes(data[pos:pos + 4])
+        size = struct.unpack_from("<I", data, pos + 4)[0]
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            audio_format, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+            if audio_format != 1:
+                return None # Compressed; let the mixer decode it
+            fmt = (rate, bits, channels)
+        elif chunk_id == b"data" and fmt:
+            return (body, min(size, len(data) - body)) + fmt
+        pos = body + size + (size & 1) # Chunks are word aligned
+    return None
+
+
+def build(path=BUNDLE_FILE, sources=DEFAULT_ASSETS):
+    """Pack the existing files among `sources` into a bundle; returns the names packed"""
+    entries = []
+    for source in sources:
+        try:
+            with open(source, "rb") as f:
+                entries.append((os.path.basename(source), f.read(), os.stat(source).st_mtime_ns))
+        except OSError:
+            continue
+
+    # Offsets depend on the index size, which depends on the offsets; settle it in two passes
+    index = {}
+    header_size = 0
+    for _ in range(2):
+        offset = header_size
+        for name, data, mtime in entries:
+            offset += -offset % ALIGN
+            pcm = _wav_pcm(data)
+            index[name] = {
+                "offset": offset,
+                "size": len(data),
+                "mtime_ns": mtime,
+                "pcm": [offset + pcm[0]] + list(pcm[1:]) if pcm else None
+            }
+            offset += len(data)
+        index_bytes = json.dumps(index).encode("utf-8")
+        header_size = len(MAGIC) + 8 + len(index_bytes) + 4096 # Room for offsets to grow a few digits
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<II", VERSION, len(index_bytes)) + index_bytes)
+        for name, data, _ in entries:
+            f.seek(index[name]["offset"])
+            f.write(data)
+    os.replace(tmp, path)
+    return [name for name, _, _ in entries]
+
+
+def ensure_bundle(path=BUNDLE_FILE, sources=DEFAULT_ASSETS):
+    """Rebuild the bundle if a loose asset is missing from it or has changed; returns whether one exists"""
+    present = [s for s in sources if os.path.exists(s)]
+    try:
+        bundle = AssetBundle(path)
+        index = bundle.index
+        bundle.close()
+    except (OSError, AssetBundleError):
+        index = None
+    if index is not None and all(
+        os.path.basename(s) in index and index[os.path.basename(s)]["mtime_ns"] == os.stat(s).st_mtime_ns
+        for s in present
+    ):
+        return True
+    if not present:
+        return index is not None
+    try:
+        build(path, sources)
+        return True
+    except OSError as e:
+        print(f"Error building {path}: {e}")
+        return False
+
+
+class ViewReader(io.RawIOBase):
+    """Seekable read-only file over a memoryview, for APIs that want a file object"""
+    def __init__(self, view):
+        self.view = view
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), len(self.view) - self.pos)
+        if n <= 0:
+            return 0
+        buffer[:n] = self.view[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        self.pos = max(0, offset)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+
+class AssetBundle:
+    def __init__(self, path=BUNDLE_FILE):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise AssetBundleError(f"{path} is empty")
+        self.view = memoryview(self.map)
+        if len(self.view) < 12 or self.view[:4] != MAGIC:
+            self.close()
+            raise AssetBundleError(f"{path} is not an asset bundle")
+        version, index_size = struct.unpack_from("<II", self.view, 4)
+        if version != VERSION:
+            self.close()
+            raise AssetBundleError(f"unsupported asset bundle version {version}")
+        try:
+            self.index = json.loads(bytes(self.view[12:12 + index_size]).decode("utf-8"))
+        except ValueError as e:
+            self.close()
+            raise AssetBundleError(f"unreadable index in {path}: {e}")
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def names(self):
+        return list(self.index)
+
+    def get(self, name):
+        """The asset's bytes as a memoryview into the map (no copy)"""
+        entry = self.index[name]
+        return self.view[entry["offset"]:entry["offset"] + entry["size"]]
+
+    def reader(self, name):
+        return ViewReader(self.get(name))
+
+    def pcm(self, name):
+        """(samples view, rate, bits, channels) for PCM WAVs, else None"""
+        pcm = self.index[name].get("pcm")
+        if not pcm:
+            return None
+        offset, size, rate, bits, channels = pcm
+        return self.view[offset:offset + size], rate, bits, channels
+
+    def warm(self, name):
+        """Ask the OS to read an asset's pages in ahead of use"""
+        if hasattr(self.map, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+            entry = self.index[name]
+            start = entry["offset"] - entry["offset"] % mmap.PAGESIZE
+            self.map.madvise(mmap.MADV_WILLNEED, start, entry["offset"] + entry["size"] - start)
+
+    def close(self):
+        try:
+            self.view.release()
+            self.map.close()
+        except (BufferError, ValueError):
+            pass # Views still handed out; the map goes when they do
+
+
+def open_bundle(path=BUNDLE_FILE, sources=DEFAULT_ASSETS):
+    """Bring the bundle up to date with the loose files and open it; None if there are no assets"""
+    if not ensure_bundle(path, sources):
+        return None
+    try:
+        return AssetBundle(path)
+    except (OSError, AssetBundleError) as e:
+        print(f"Error opening {path}: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Asset bundle tools")
+    parser.add_argument("command", choices=["build", "list"])
+    parser.add_argument("files", nargs="*", default=DEFAULT_ASSETS)
+    parser.add_argument("-o", "--output", default=BUNDLE_FILE)
+    args = parser.parse_args()
+    if args.command == "build":
+        print(f"Packed {', '.join(build(args.output, args.files)) or 'nothing'} into {args.output}")
+    else:
+        bundle = AssetBundle(args.output)
+        for name, entry in bundle.index.items():
+            pcm = entry.get("pcm")
+            fmt = f"{pcm[2]} Hz {pcm[3]}-bit x{pcm[4]}" if pcm else "encoded"
+            print(f"{name:20s} {entry['size']:>10} bytes  {fmt}")
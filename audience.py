@@ -0,0 +1,268 @@
+"""Audience mode: one shared playthrough, many viewers voting on each choice.
+
+Every viewer watches the same story. When choices come up a voting round
+opens for --vote-seconds; the choice with the most votes (ties go to the
+earlier option, no votes to a random one) is taken and the story moves on.
+When it reaches an end it starts again.
+
+Each message is encoded into a WebSocket frame once and the same bytes
+are written to every viewer. A round's tally is one counter per option,
+and each viewer remembers the last round it voted in, so memory per
+round doesn't grow with the audience.
+
+    python audience.py [--port 8766]
+    python audience.py --bench 5000       # simulated viewers, no sockets
+
+Protocol (JSON text frames, see server.py for the framing):
+
+    server -> viewers
+        {"type": "text", "chunk": "..."}
+        {"type": "round", "round": 3, "choices": [...], "seconds": 10}
+        {"type": "result", "round": 3, "index": 1, "tally": [12, 30]}
+
+    viewer -> server
+        {"type": "vote", "round": 3, "index": 1}
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+from server import Session, encode_frame, encode_message, read_frame, read_request, http_response, text_chunks, upgrade
+
+MAX_BUFFERED = 256 * 1024  # Viewers further behind than this are dropped
+
+
+class Viewer:
+    __slots__ = ("writer", "voted_round")
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.voted_round = -1
+
+
+class Audience:
+    def __init__(self, vote_seconds=10.0, chunk_chars=3, chunk_ms=50):
+        self.vote_seconds = vote_seconds
+        self.chunk_chars = chunk_chars
+        self.chunk_ms = chunk_ms
+        self.session = Session("audience")
+        self.viewers = set()
+        self.round = 0
+        self.tally = []
+        self.voting = False
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+
+    def broadcast(self, frame):
+        """Write one pre-encoded frame to every viewer"""
+        stale = []
+        for viewer in self.viewers:
+            transport = viewer.writer.transport
+            if transport.get_write_buffer_size() > MAX_BUFFERED:
+                stale.append(viewer)
+                continue
+            viewer.writer.write(frame)
+        for viewer in stale:
+            self.viewers.discard(viewer)
+            viewer.writer.close()
+            self.dropped += 1
+        self.frames_sent += len(self.viewers)
+        self.bytes_sent += len(frame) * len(self.viewers)
+
+    def vote(self, viewer, round_no, index):
+        """Count a vote; one per viewer per round, ignored outside the window"""
+        if not self.voting or round_no != self.round or viewer.voted_round == self.round:
+            return False
+        if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < len(self.tally):
+            return False
+        viewer.voted_round = self.round
+        self.tally[index] += 1
+        return True
+
+    def winner(self):
+        best = max(self.tally) if self.tally else 0
+        if best == 0:
+            return random.randrange(len(self.tally))
+        return self.tally.index(best)
+
+    async def collect_votes(self):
+        await asyncio.sleep(self.vote_seconds)
+
+    async def play(self, rounds=None):
+        """Run the shared story: stream text, hold a vote, take the winner, repeat"""
+        text = self.session.begin()
+        played = 0
+        while rounds is None or played < rounds:
+            if text is None:
+                # End of the story (or quit): start a new playthrough for the same audience
+                self.session = Session("audience")
+                text = self.session.begin()
+                continue
+            for chunk in text_chunks(text, self.chunk_chars):
+                self.broadcast(encode_message({"type": "text", "chunk": chunk}))
+                if self.chunk_ms:
+                    await asyncio.sleep(self.chunk_ms / 1000.0)
+
+            self.round += 1
+            self.tally = [0] * len(self.session.play.choices)
+            self.voting = True
+            self.broadcast(encode_message({
+                "type": "round", "round": self.round,
+                "choices": self.session.choice_labels(), "seconds": self.vote_seconds
+            }))
+            await self.collect_votes()
+            self.voting = False
+
+            index = self.winner()
+            self.broadcast(encode_message({"type": "result", "round": self.round, "index": index, "tally": self.tally}))
+            _, text = self.session.choose(index)
+            self.session.history.clear()  # Nobody resumes the shared session; don't keep a transcript
+            played += 1
+
+    async def handle(self, reader, writer):
+        viewer = None
+        try:
+            method, target, headers = await read_request(reader)
+            if urlsplit(target).path != "/ws":
+                writer.write(http_response("404 Not Found", b"not found"))
+                await writer.drain()
+                return
+            if not upgrade(writer, headers):
+                await writer.drain()
+                return
+            viewer = Viewer(writer)
+            self.viewers.add(viewer)
+            if self.voting:
+                writer.write(encode_message({
+                    "type": "round", "round": self.round,
+                    "choices": self.session.choice_labels(), "seconds": self.vote_seconds
+                }))
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == 0x8:
+                    writer.write(encode_frame(b"", 0x8))
+                    break
+                if opcode != 0x1:
+                    continue
+                try:
+                    message = json.loads(payload)
+                except ValueError:
+                    continue
+                if isinstance(message, dict) and message.get("type") == "vote":
+                    self.vote(viewer, message.get("round"), message.get("index"))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.viewers.discard(viewer)
+            writer.close()
+
+
+class _FakeTransport:
+    __slots__ = ()
+
+    def get_write_buffer_size(self):
+        return 0
+
+
+class _FakeWriter:
+    """Stands in for a viewer's StreamWriter in the benchmark"""
+    __slots__ = ("transport", "bytes", "frames", "last")
+    _transport = _FakeTransport()
+
+    def __init__(self):
+        self.transport = self._transport
+        self.bytes = 0
+        self.frames = 0
+        self.last = None
+
+    def write(self, data):
+        self.bytes += len(data)
+        self.frames += 1
+        self.last = data
+
+    def close(self):
+        pass
+
+
+class _SimulatedAudience(Audience):
+    """Audience whose voting window is filled by simulated viewers"""
+    def __init__(self, viewers, vote_fraction):
+        super().__init__(vote_seconds=0, chunk_ms=0)
+        self.viewers = set(viewers)
+        self.simulated = viewers
+        self.vote_fraction = vote_fraction
+        self.vote_time = 0.0
+        self.votes = 0
+
+    async def collect_votes(self):
+        start = time.perf_counter()
+        for viewer in self.simulated:
+            if random.random() < self.vote_fraction:
+                self.votes += self.vote(viewer, self.round, random.randrange(len(self.tally)))
+        self.vote_time += time.perf_counter() - start
+
+
+async def bench(viewer_count, rounds, vote_fraction=0.8):
+    """Simulate an audience in-process and report fan-out and vote costs"""
+    tracemalloc.start()
+    viewers = [Viewer(_FakeWriter()) for _ in range(viewer_count)]
+    baseline = tracemalloc.get_traced_memory()[0]
+    audience = _SimulatedAudience(viewers, vote_fraction)
+
+    start = time.perf_counter()
+    await audience.play(rounds=rounds)
+    elapsed = time.perf_counter() - start
+
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "viewers": viewer_count,
+        "rounds": rounds,
+        "frames_sent": audience.frames_sent,
+        "bytes_sent": audience.bytes_sent,
+        "votes": audience.votes,
+        "seconds_total": round(elapsed, 4),
+        "fanout_us_per_frame": round((elapsed - audience.vote_time) / max(1, audience.frames_sent) * 1e6, 4),
+        "vote_us_each": round(audience.vote_time / max(1, audience.votes) * 1e6, 4),
+        # Every viewer was handed the same frame object, not a copy
+        "distinct_last_frame_objects": len({id(v.writer.last) for v in viewers}),
+        "memory_growth_bytes": current - baseline,
+        "memory_peak_bytes": peak - baseline
+    }
+
+
+async def serve(host, port, audience):
+    server = await asyncio.start_server(audience.handle, host, port)
+    print(f"Audience mode on ws://{host}:{port}/ws")
+    async with server:
+        await asyncio.gather(server.serve_forever(), audience.play())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandersnatch audience mode")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--vote-seconds", type=float, default=10)
+    parser.add_argument("--chunk-chars", type=int, default=3)
+    parser.add_argument("--chunk-ms", type=float, default=50)
+    parser.add_argument("--bench", type=int, metavar="VIEWERS", help="benchmark with simulated viewers and exit")
+    parser.add_argument("--bench-rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.bench:
+        print(json.dumps(asyncio.run(bench(args.bench, args.bench_rounds)), indent=2))
+        return
+    audience = Audience(args.vote_seconds, args.chunk_chars, args.chunk_ms)
+    try:
+        asyncio.run(serve(args.host, args.port, audience))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Replay scripted playthroughs through the story, with no UI and no delays.
+
+A script is a list of choices, each either a 1-based option number or
+the option's label (case-insensitive), as shown in the terminal version.
+Scripts come from:
+
+    *.txt (or any other file)   one choice per line, one script per file
+    *.jsonl                     one script per line, either a JSON list of
+                                choices or {"id": ..., "choices": [...]}
+
+For every script one JSON line is written with the visited nodes, the
+endings reached and the final state. Scripts are spread across worker
+processes, so large regression sets finish quickly:
+
+    python batch.py recorded.jsonl -j 8 -o results.jsonl
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+from story import Playthrough
+
+MAX_STEPS = 10000  # Guard against scripts that never stop
+
+
+def load_scripts(path):
+    """Yield (script_id, choices) for every script in `path`"""
+    with open(path) as f:
+        if path.endswith(".jsonl"):
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                if isinstance(item, dict):
+                    yield item.get("id", f"{path}:{line_no}"), item["choices"]
+                else:
+                    yield f"{path}:{line_no}", item
+        else:
+            yield path, [line.strip() for line in f if line.strip()]
+
+
+def _resolve(choices, wanted):
+    if isinstance(wanted, int) or (isinstance(wanted, str) and wanted.isdigit()):
+        index = int(wanted) - 1
+        return index if 0 <= index < len(choices) else None
+    wanted = str(wanted).lower()
+    for i, choice in enumerate(choices):
+        if choice.label.lower() == wanted:
+            return i
+    return None
+
+
+def run_script(item):
+    """Play one (script_id, choices) pair; returns the result dict"""
+    script_id, script = item
+    play = Playthrough()
+    visited = []
+    endings = []
+    error = None
+
+    play.enter()
+    visited.append(play.node_id)
+    for step, wanted in enumerate(script):
+        if step >= MAX_STEPS:
+            error = "too many steps"
+            break
+        if play.node is None:
+            error = f"choice {step + 1} after the end of the story"
+            break
+        index = _resolve(play.choices, wanted)
+        if index is None:
+            error = f"choice {step + 1} ({wanted!r}) not available at {play.node_id}"
+            break
+        if play.choose(index).target == "quit":
+            break
+        play.enter()
+        visited.append(play.node_id)
+        node = play.node
+        if node is not None and node.ending:
+            endings.append(node.ending)
+
+    result = {
+        "id": script_id,
+        "visited": visited,
+        "endings": endings,
+        "final_node": play.node_id,
+        "final_state": dict(play.state)
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+def run_all(items, jobs=None, chunksize=256):
+    """Yield results for every script, in order, using `jobs` processes"""
+    if jobs == 1:
+        for item in items:
+            yield run_script(item)
+        return
+    with multiprocessing.Pool(jobs) as pool:
+        yield from pool.imap(run_script, items, chunksize=chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay scripted Bandersnatch playthroughs")
+    parser.add_argument("scripts", nargs="+", help="choice script files (.txt or .jsonl)")
+    parser.add_argument("-o", "--output", help="write JSONL results here instead of stdout")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes (default: all CPUs)")
+    args = parser.parse_args()
+
+    items = (item for path in args.scripts for item in load_scripts(path))
+    out = open(args.output, "w") if args.output else sys.stdout
+    failures = 0
+    try:
+        for result in run_all(items, jobs=args.jobs):
+            failures += "error" in result
+            out.write(json.dumps(result) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if failures:
+        print(f"{failures} script(s) failed", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
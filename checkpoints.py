@@ -0,0 +1,69 @@
+"""Checkpoints at every choice point, for rewinding to an earlier decision.
+
+Each checkpoint stores only the state fields that changed since its
+parent and points at that parent, so taking one costs as much as the
+choice's effects and the whole chain shares everything else. State
+values are never mutated in place (see story.GameState), so sharing is
+safe. Rewinding walks the chain once to rebuild the full state.
+"""
+
+
+class Checkpoint:
+    __slots__ = ("parent", "changes", "node_id", "label", "history_len", "rows")
+
+    def __init__(self, parent, changes, node_id, label, history_len, rows):
+        self.parent = parent
+        self.changes = changes
+        self.node_id = node_id
+        self.label = label
+        self.history_len = history_len
+        self.rows = rows
+
+    def materialize(self):
+        """Full state dict as it was when this checkpoint was taken"""
+        result = {}
+        cp = self
+        while cp is not None:
+            for key, value in cp.changes.items():
+                if key not in result:
+                    result[key] = value
+            cp = cp.parent
+        return result
+
+
+class CheckpointLog:
+    def __init__(self, max_checkpoints=100):
+        self.max_checkpoints = max_checkpoints
+        self.checkpoints = []
+
+    def reset(self, state):
+        """Forget all checkpoints; the next one will hold a full snapshot"""
+        self.checkpoints = []
+        state.dirty = set(state)
+
+    def take(self, state, node_id, label, history_len, rows):
+        parent = self.checkpoints[-1] if self.checkpoints else None
+        cp = Checkpoint(parent, state.take_changes(), node_id, label, history_len, rows)
+        self.checkpoints.append(cp)
+
+        if len(self.checkpoints) > self.max_checkpoints:
+            # Fold the oldest kept checkpoint into a standalone base so the chain stays bounded
+            del self.checkpoints[0]
+            base = self.checkpoints[0]
+            base.changes = base.materialize()
+            base.parent = None
+        return cp
+
+    def rewind(self, state, cp, keep=("volume",)):
+        """Restore `state` to checkpoint `cp` and drop every later checkpoint"""
+        index = self.checkpoints.index(cp)
+        del self.checkpoints[index + 1:]
+        snapshot = cp.materialize()
+        for key in keep:
+            if key in state:
+                snapshot[key] = state[key]
+        dict.clear(state)
+        dict.update(state, snapshot)
+        # State now matches cp exactly; later checkpoints only need what changes next
+        state.dirty = set(keep) & set(state)
+        return cp
@@ -0,0 +1,91 @@
+"""Clocks the UI schedules its delays on.
+
+TkClock runs callbacks on the Tk event loop with real milliseconds (what
+the game uses). VirtualClock keeps its own simulated time and only runs
+callbacks when told to advance, in due-time order, so a driver or test
+can walk the whole GUI flow - typing, the click/reply beats, blinking,
+scrolling - without waiting in real time:
+
+    clock = VirtualClock()
+    app = BandersnatchApp(root, clock=clock)
+    app.start_game()
+    clock.advance(60000)     # a minute of game time, instantly
+    root.update_idletasks()  # let Tk redraw
+
+Both hand out handles that cancel() accepts, and now() in milliseconds.
+"""
+import heapq
+import itertools
+import time
+
+
+class TkClock:
+    def __init__(self, root):
+        self.root = root
+
+    def now(self):
+        return time.monotonic() * 1000.0
+
+    def call_later(self, ms, func, *args):
+        return self.root.after(int(ms), func, *args)
+
+    def call_idle(self, func, *args):
+        return self.root.after_idle(func, *args)
+
+    def cancel(self, handle):
+        if handle is not None:
+            self.root.after_cancel(handle)
+
+
+class VirtualClock:
+    def __init__(self, start_ms=0.0):
+        self.time = float(start_ms)
+        self.queue = [] # (due, seq, handle)
+        self.callbacks = {} # handle -> (func, args); cancelled handles are dropped from here
+        self.seq = itertools.count()
+        self.ran = 0
+
+    def now(self):
+        return self.time
+
+    def call_later(self, ms, func, *args):
+        seq = next(self.seq)
+        handle = f"virtual#{seq}"
+        self.callbacks[handle] = (func, args)
+        heapq.heappush(self.queue, (self.time + max(0, ms), seq, handle))
+        return handle
+
+    def call_idle(self, func, *args):
+        return self.call_later(0, func, *args)
+
+    def cancel(self, handle):
+        self.callbacks.pop(handle, None)
+
+    def pending(self):
+        return len(self.callbacks)
+
+    def advance(self, ms):
+        """Move time forward by `ms`, running everything that falls due on the way"""
+        end = self.time + ms
+        while self.queue and self.queue[0][0] <= end:
+            due, _, handle = heapq.heappop(self.queue)
+            callback = self.callbacks.pop(handle, None)
+            if callback is None:
+                continue
+            self.time = max(self.time, due)
+            func, args = callback
+            func(*args)
+            self.ran += 1
+        self.time = end
+
+    def run_until(self, predicate, limit_ms=3600 * 1000.0):
+        """Advance callback by callback until predicate() holds; returns whether it did"""
+        end = self.time + limit_ms
+        while not predicate():
+            # Skip cancelled entries so we jump straight to the next real callback
+            while self.queue and self.queue[0][2] not in self.callbacks:
+                heapq.heappop(self.queue)
+            if not self.queue or self.queue[0][0] > end:
+                return False
+            self.advance(self.queue[0][0] - self.time)
+        return True
@@ -0,0 +1,140 @@
+"""Precomputed text layout for chat bubbles.
+
+Tk only knows how a bubble's text wraps once it has laid the text out.
+LayoutCache lays each text out once on a hidden canvas (one layout pass,
+not one per typed character), records the line starts and pixel size,
+and keeps the results in layout_cache.json keyed by (font, size, wrap
+width, text hash). Bubbles can then open at their final size, and typing
+can break lines where the finished text will, instead of words jumping
+to the next line as they grow.
+
+precompute() measures texts ahead of time in small slices when the UI is
+idle; anything not precomputed is measured the first time it's shown.
+`width` is the current wrap width; the app moves it as the window is
+resized, and each width gets its own entries.
+"""
+import hashlib
+import json
+import os
+import time
+from tkinter import font as tkfont
+import tkinter as tk
+
+from clock import TkClock
+
+LAYOUT_CACHE_FILE = "layout_cache.json"
+LAYOUT_CACHE_VERSION = 1
+MAX_ENTRIES = 5000
+SLICE_SECONDS = 0.008 # Measuring budget per idle slice
+
+
+class Layout:
+    __slots__ = ("width", "height", "line_starts")
+
+    def __init__(self, width, height, line_starts):
+        self.width = width
+        self.height = height
+        self.line_starts = line_starts # Index of the first character of every line after the first
+
+    def wrap(self, text):
+        """`text` with the spaces Tk wraps at turned into newlines (same length, so prefixes line up)"""
+        chars = list(text)
+        for start in self.line_starts:
+            if 0 < start <= len(chars) and chars[start - 1] == " ":
+                chars[start - 1] = "\n"
+        return "".join(chars)
+
+
+class LayoutCache:
+    def __init__(self, root, font_spec, width, path=LAYOUT_CACHE_FILE, clock=None):
+        self.root = root
+        self.clock = clock or TkClock(root)
+        self.font_spec = font_spec
+        self.width = width
+        self.path = path
+        self.canvas = tk.Canvas(root) # Never packed; only used to lay text out
+        self.linespace = tkfont.Font(root=root, font=font_spec).metrics("linespace")
+        self.prefix = self._key_prefix()
+        self.entries = {}
+        self.pending = []
+        self.job = None
+        self.dirty = False
+        self.measured = 0
+        self._load()
+
+    def _key_prefix(self):
+        actual = tkfont.Font(root=self.root, font=self.font_spec).actual()
+        scaling = float(self.root.tk.call("tk", "scaling"))
+        return f"{actual['family']}|{actual['size']}|{actual['weight']}|{scaling:.3f}|"
+
+    def key(self, text, width=None):
+        return f"{self.prefix}{width or self.width}|" + hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") == LAYOUT_CACHE_VERSION:
+                self.entries = data.get("entries", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        if not self.dirty:
+            return
+        while len(self.entries) > MAX_ENTRIES:
+            del self.entries[next(iter(self.entries))] # Oldest first
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"version": LAYOUT_CACHE_VERSION, "entries": self.entries}, f)
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Error saving layout cache: {e}")
+
+    def get(self, text, width=None):
+        """Layout for `text` wrapped at `width` (default: the current width), measuring it now if it isn't cached"""
+        width = width or self.width
+        key = self.key(text, width)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = self._measure(text, width)
+            self.dirty = True
+        return Layout(*entry)
+
+    def _measure(self, text, width):
+        item = self.canvas.create_text(0, 0, text=text, font=self.font_spec, anchor="nw", width=width)
+        bbox = self.canvas.bbox(item)
+        if not bbox:
+            self.canvas.delete(item)
+            return [0, 0, []]
+        width, height = bbox[2] - bbox[0], bbox[3] - bbox[1]
+        lines = max(1, round(height / self.linespace))
+        starts = [
+            int(self.canvas.index(item, f"@0,{line * self.linespace + self.linespace // 2}"))
+            for line in range(1, lines)
+        ]
+        self.canvas.delete(item)
+        self.measured += 1
+        return [width, height, starts]
+
+    def precompute(self, texts):
+        """Queue texts to be measured during idle time, at whatever the width is when their turn comes"""
+        self.pending.extend(text for text in texts if self.key(text) not in self.entries)
+        if self.pending and self.job is None:
+            self.job = self.clock.call_idle(self._work)
+
+    def _work(self):
+        self.job = None
+        deadline = time.perf_counter() + SLICE_SECONDS
+        while self.pending and time.perf_counter() < deadline:
+            self.get(self.pending.pop())
+        if self.pending:
+            # Give pending events a turn before the next slice
+            self.job = self.clock.call_later(15, self._schedule_idle)
+        else:
+            self.save()
+
+    def _schedule_idle(self):
+        self.job = self.clock.call_idle(self._work)
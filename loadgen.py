@@ -0,0 +1,296 @@
+"""Load generator for sizing story-server hardware.
+
+Simulates N concurrent players walking the story and reports throughput,
+click-to-text latency percentiles and memory per session as JSON, so
+runs can be compared across versions.
+
+    python loadgen.py --players 1000 --steps 50                 # in-process
+    python loadgen.py --players 200 --url ws://127.0.0.1:8765/ws  # against server.py
+
+Policies:
+    random   pick a random available choice
+    scripted replay choice scripts from --scripts (same format as batch.py)
+    rapid    adversarial: fire several clicks at once, including while
+             text is still streaming and out-of-range indices
+
+Click-to-text latency is measured from sending a choice to receiving the
+first chunk of the next node's text.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import random
+import struct
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+from batch import load_scripts
+from server import StoryServer, read_frame, open_store
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    values = sorted(values)
+    n = len(values)
+
+    def pick(q):
+        return round(values[min(n - 1, int(n * q))], 4)
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(values[-1], 4)}
+
+
+class Policy:
+    def __init__(self, name, scripts=None):
+        self.name = name
+        self.scripts = scripts or []
+
+    def script_for(self, player_no):
+        if self.name != "scripted" or not self.scripts:
+            return None
+        return iter(self.scripts[player_no % len(self.scripts)])
+
+    def pick(self, labels, script):
+        """Return the list of indices to click for this turn"""
+        if script is not None:
+            wanted = next(script, None)
+            if wanted is None:
+                return []
+            if isinstance(wanted, int) or str(wanted).isdigit():
+                return [int(wanted) - 1]
+            lowered = [label.lower() for label in labels]
+            return [lowered.index(str(wanted).lower())] if str(wanted).lower() in lowered else []
+        index = random.randrange(len(labels))
+        if self.name == "rapid":
+            return [index, index, random.randrange(len(labels)), len(labels) + 3]
+        return [index]
+
+
+async def think(think_ms):
+    if think_ms:
+        await asyncio.sleep(random.expovariate(1.0 / think_ms) / 1000.0)
+
+
+class Results:
+    def __init__(self):
+        self.latencies_ms = []
+        self.transitions = 0
+        self.ignored_clicks = 0
+        self.rejected_clicks = 0
+        self.errors = 0
+
+
+class _Pipe:
+    """Write end of an in-memory byte stream; whatever is written comes out of `reader`.
+
+    Quacks like the StreamWriter the server writes to, so StoryServer.handle
+    runs unchanged on a pair of these.
+    """
+    def __init__(self):
+        self.reader = asyncio.StreamReader()
+        self.closed = False
+
+    def write(self, data):
+        if not self.closed:
+            self.reader.feed_data(data)
+
+    async def drain(self):
+        pass # Never backed up, like a socket well below its high-water mark
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.reader.feed_eof()
+
+
+def open_in_process(story_server):
+    """Connect to `story_server` without sockets; returns (reader, writer, server task)"""
+    to_server, to_client = _Pipe(), _Pipe()
+    task = asyncio.ensure_future(story_server.handle(to_server.reader, to_client))
+    return to_client.reader, to_server, task
+
+
+def client_frame(message):
+    """Masked client-to-server text frame"""
+    payload = json.dumps(message).encode("utf-8")
+    mask = os.urandom(4)
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x81, 0x80 | length)
+    else:
+        header = struct.pack("!BBH", 0x81, 0x80 | 126, length)
+    key = (mask * (length // 4 + 1))[:length]
+    masked = (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
+    return header + mask + masked
+
+
+async def handshake(reader, writer, host, path):
+    key = base64.b64encode(os.urandom(16)).decode("latin-1")
+    writer.write((
+        f"GET {path or '/ws'} HTTP/1.1\r\nHost: {host}\r\n"
+        "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+    ).encode("latin-1"))
+    while (await reader.readline()).strip():
+        pass
+
+
+async def play(reader, writer, player_no, policy, steps, think_ms, results):
+    """One player on an open WebSocket connection to the server"""
+    script = policy.script_for(player_no)
+    sent_at = None
+    taken = 0
+    clicks_sent = 0
+    accepted = 0
+    rejected = 0
+    turn_clicks = turn_rejected = 0
+    try:
+        # Keep reading after the last click until its text arrives, so it's counted
+        while taken < steps or sent_at is not None:
+            try:
+                _, payload = await read_frame(reader)
+            except asyncio.IncompleteReadError:
+                break # Server hung up: the player quit the story
+            message = json.loads(payload)
+            kind = message.get("type")
+            if kind == "text" and sent_at is not None:
+                results.latencies_ms.append((time.perf_counter() - sent_at) * 1000.0)
+                results.transitions += 1
+                accepted += 1
+                sent_at = None
+            elif kind == "error":
+                rejected += 1
+                turn_rejected += 1
+                if turn_rejected == turn_clicks:
+                    break # Every click this turn was refused; nothing more is coming
+            elif kind == "end":
+                break
+            elif kind == "choices":
+                if taken >= steps:
+                    break
+                await think(think_ms)
+                clicks = policy.pick(message["choices"], script)
+                if not clicks:
+                    break
+                sent_at = time.perf_counter()
+                turn_clicks, turn_rejected = len(clicks), 0
+                for click in clicks:
+                    writer.write(client_frame({"type": "choose", "index": click}))
+                clicks_sent += len(clicks)
+                await writer.drain()
+                taken += 1
+    finally:
+        writer.close()
+        results.rejected_clicks += rejected
+        # The server drops clicks while text is streaming without a reply; they're the remainder
+        results.ignored_clicks += max(0, clicks_sent - accepted - rejected)
+
+
+async def play_over_socket(url, player_no, policy, steps, think_ms, results):
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    await handshake(reader, writer, parts.netloc, parts.path)
+    await play(reader, writer, player_no, policy, steps, think_ms, results)
+
+
+async def play_in_process(story_server, player_no, policy, steps, think_ms, results):
+    """One player against a StoryServer in this process, through its real connection handler"""
+    reader, writer, server_task = open_in_process(story_server)
+    try:
+        await handshake(reader, writer, "in-process", "/ws")
+        await play(reader, writer, player_no, policy, steps, think_ms, results)
+    finally:
+        writer.close()
+        await server_task # Session released back to the store
+
+
+async def measure_session_memory(args, policy, sample=200):
+    """Bytes per played session, from an untimed pass (tracemalloc would skew latencies)"""
+    count = min(args.players, sample)
+    tracemalloc.start()
+    store = open_store(":memory:", capacity=count)
+    story_server = StoryServer(store, chunk_chars=args.chunk_chars, chunk_ms=0)
+    baseline = tracemalloc.get_traced_memory()[0]
+    await asyncio.gather(*[
+        play_in_process(story_server, i, policy, args.steps, 0, Results())
+        for i in range(count)
+    ])
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    store.close()
+    return used / count
+
+
+async def run(args):
+    scripts = [choices for path in (args.scripts or []) for _, choices in load_scripts(path)]
+    policy = Policy(args.policy, scripts)
+    results = Results()
+
+    memory_per_session = None
+    store = None
+    if args.url:
+        players = [play_over_socket(args.url, i, policy, args.steps, args.think_ms, results) for i in range(args.players)]
+    else:
+        memory_per_session = await measure_session_memory(args, policy)
+        store = open_store(args.db, capacity=args.max_resident)
+        story_server = StoryServer(store, chunk_chars=args.chunk_chars, chunk_ms=args.chunk_ms)
+        players = [
+            play_in_process(story_server, i, policy, args.steps, args.think_ms, results)
+            for i in range(args.players)
+        ]
+
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*players, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    results.errors += sum(isinstance(o, Exception) for o in outcomes)
+    if store is not None:
+        store.close()
+
+    return {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "mode": "socket" if args.url else "in-process",
+        "players": args.players,
+        "policy": args.policy,
+        "think_ms": args.think_ms,
+        "seconds": round(elapsed, 4),
+        "transitions": results.transitions,
+        "throughput_per_s": round(results.transitions / elapsed, 2) if elapsed else None,
+        "click_to_text_ms": percentiles(results.latencies_ms),
+        "ignored_clicks": results.ignored_clicks,
+        "rejected_clicks": results.rejected_clicks,
+        "errors": results.errors,
+        "memory_per_session_bytes": round(memory_per_session) if memory_per_session is not None else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandersnatch load generator")
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--steps", type=int, default=50, help="choices per player")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean think time between choices")
+    parser.add_argument("--policy", choices=["random", "scripted", "rapid"], default="random")
+    parser.add_argument("--scripts", nargs="*", help="choice scripts for the scripted policy")
+    parser.add_argument("--url", help="ws:// URL of a running server.py; in-process when omitted")
+    parser.add_argument("--chunk-chars", type=int, default=3, help="in-process: characters per text chunk")
+    parser.add_argument("--chunk-ms", type=float, default=0, help="in-process: delay between text chunks")
+    parser.add_argument("--db", default=":memory:", help="in-process: session store database")
+    parser.add_argument("--max-resident", type=int, default=10000, help="in-process: sessions kept in memory")
+    parser.add_argument("--label", default="", help="free-form tag for comparing runs, e.g. a git revision")
+    parser.add_argument("-o", "--output", help="write the JSON report here as well as stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
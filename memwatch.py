@@ -0,0 +1,167 @@
+"""Memory and resource sampling for long-running sessions.
+
+MemoryWatch samples, on a timer or on demand:
+
+    rss_bytes        resident set size (working set on Windows) of the process
+    traced_bytes     Python allocations tracked by tracemalloc
+    top              the largest allocation sites (file:line, bytes, count)
+    widgets          Tk widgets alive under the root
+    pending_after    timers waiting to fire (Tk `after info`, or the clock's own count)
+
+plus whatever counters the app adds (transcript length, checkpoints,
+...), and appends each sample as a JSON line to a time-series file.
+find_growth() reads a series and names the metrics that keep growing
+instead of levelling off; soak.py uses it to fail a long run.
+
+    python app.py --memwatch mem.jsonl [--memwatch-interval 5000]
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from clock import TkClock
+
+MEMWATCH_ENV = "BANDERSNATCH_MEMWATCH"
+
+
+def _windows_rss():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    kernel32 = ctypes.WinDLL("kernel32")
+    psapi = ctypes.WinDLL("psapi")
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+    psapi.GetProcessMemoryInfo.restype = wintypes.BOOL
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+        return None
+    return counters.WorkingSetSize # The working set is what Task Manager shows as memory in use
+
+
+def rss_bytes():
+    if sys.platform == "win32":
+        try:
+            return _windows_rss()
+        except (OSError, AttributeError):
+            return None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # Peak, not current; the best we can do here
+    except ImportError:
+        return None
+
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+class MemoryWatch:
+    def __init__(self, root, path, interval_ms=5000, top=10, clock=None, counters=None):
+        self.root = root
+        self.path = path
+        self.interval_ms = interval_ms
+        self.top = top
+        self.clock = clock or TkClock(root)
+        self.counters = counters # Callable returning {name: number} of app-level sizes
+        self.started = time.monotonic()
+        self.samples = 0
+        self.job = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.job = self.clock.call_later(self.interval_ms, self._tick)
+
+    def stop(self):
+        self.clock.cancel(self.job)
+        self.job = None
+
+    def _tick(self):
+        self.sample()
+        self.job = self.clock.call_later(self.interval_ms, self._tick)
+
+    def pending_after(self):
+        if hasattr(self.clock, "pending"):
+            return self.clock.pending()
+        return len(self.root.tk.splitlist(self.root.tk.call("after", "info")))
+
+    def sample(self, **extra):
+        """Take one sample, append it to the series file and return it"""
+        traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+        top = []
+        if tracemalloc.is_tracing() and self.top:
+            for stat in tracemalloc.take_snapshot().statistics("lineno")[:self.top]:
+                frame = stat.traceback[0]
+                top.append({"where": f"{frame.filename}:{frame.lineno}", "bytes": stat.size, "count": stat.count})
+        row = {
+            "t": round(time.monotonic() - self.started, 3),
+            "rss_bytes": rss_bytes(),
+            "traced_bytes": traced,
+            "traced_peak_bytes": peak,
+            "widgets": count_widgets(self.root),
+            "pending_after": self.pending_after(),
+        }
+        if self.counters:
+            row.update(self.counters())
+        row.update(extra)
+        row["top"] = top
+        self.samples += 1
+        try:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(row) + "\n")
+        except OSError as e:
+            print(f"Error writing memory sample: {e}")
+        return row
+
+
+def load_series(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_growth(series, metrics, warmup=0.25, tolerance=0.10, slack=None):
+    """Metrics whose peak in the last half of the run (after warmup) is clearly above the first half's.
+
+    A bounded metric levels off, so both halves peak at about the same
+    value; one that leaks keeps setting new highs. `slack` gives an
+    absolute allowance per metric on top of the relative tolerance.
+    Returns {metric: (first half peak, second half peak)}.
+    """
+    slack = slack or {}
+    rows = series[int(len(series) * warmup):]
+    half = len(rows) // 2
+    if half < 2:
+        return {}
+    growing = {}
+    for metric in metrics:
+        first = [r[metric] for r in rows[:half] if r.get(metric) is not None]
+        second = [r[metric] for r in rows[half:] if r.get(metric) is not None]
+        if not first or not second:
+            continue
+        before, after = max(first), max(second)
+        if after > before * (1 + tolerance) + slack.get(metric, 0):
+            growing[metric] = (before, after)
+    return growing
@@ -0,0 +1,43 @@
+"""Pacing profiles: how fast story text types out and how long the beats
+between story steps last.
+
+    char_ms      delay between typed characters; 0 shows text whole
+    echo_ms      click -> the player's choice appears in the chat
+    reply_ms     choice appears -> the next node starts typing
+    start_ms     NEW GAME -> the game screen
+    continue_ms  CONTINUE -> the game screen
+    sound        play the typing sound
+
+"turbo" is for testers: no delays and no typing sound, so a playthrough
+can be clicked (or keyed, 1-9) through in seconds. It is only selectable
+with --turbo, not from the in-game menu.
+"""
+
+
+class Pacing:
+    __slots__ = ("name", "char_ms", "echo_ms", "reply_ms", "start_ms", "continue_ms", "sound")
+
+    def __init__(self, name, char_ms, echo_ms, reply_ms, start_ms, continue_ms, sound=True):
+        self.name = name
+        self.char_ms = char_ms
+        self.echo_ms = echo_ms
+        self.reply_ms = reply_ms
+        self.start_ms = start_ms
+        self.continue_ms = continue_ms
+        self.sound = sound
+
+
+PROFILES = {
+    "cinematic": Pacing("cinematic", 70, 600, 1200, 2500, 1500),
+    "normal": Pacing("normal", 50, 400, 800, 1500, 1000),
+    "fast": Pacing("fast", 15, 150, 300, 400, 300),
+    "instant": Pacing("instant", 0, 0, 150, 0, 0),
+}
+TURBO = Pacing("turbo", 0, 0, 0, 0, 0, sound=False)
+DEFAULT_PROFILE = "normal"
+
+
+def get_profile(name):
+    if name == TURBO.name:
+        return TURBO
+    return PROFILES.get(name, PROFILES[DEFAULT_PROFILE])
@@ -0,0 +1,196 @@
+"""Opt-in performance tracing for Bandersnatch.
+
+Turn it on with the BANDERSNATCH_TRACE environment variable (or the
+--trace flag of app.py) set to an output path. Spans are written as a
+Chrome/Perfetto trace-event JSON file (open it in chrome://tracing or
+ui.perfetto.dev) and a per-span latency histogram is written next to it
+as <path>.summary.json.
+
+When tracing is off every hook is a single attribute check.
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tkinter as tk
+
+TRACE_ENV = "BANDERSNATCH_TRACE"
+STALL_ENV = "BANDERSNATCH_TRACE_STALL_MS"
+
+# Histogram bucket upper bounds in milliseconds
+HISTOGRAM_BUCKETS = [0.1, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+def _now_us():
+    return time.perf_counter_ns() / 1000.0
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.stall_ms = 50
+        self.events = []
+        self.durations = {}
+        self.pid = os.getpid()
+        self._original_after = None
+
+    def enable(self, path, stall_ms=50):
+        """Start recording; results are written to `path` at exit"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.path = path
+        self.stall_ms = stall_ms
+        self.events.append({
+            "name": "process_name", "ph": "M", "pid": self.pid, "tid": 0,
+            "args": {"name": "bandersnatch"}
+        })
+        atexit.register(self.write)
+
+    def record(self, name, start_us, end_us, args=None):
+        dur = end_us - start_us
+        event = {
+            "name": name, "ph": "X", "ts": start_us, "dur": dur,
+            "pid": self.pid, "tid": threading.get_ident()
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+        self.durations.setdefault(name, []).append(dur / 1000.0)
+
+    def instant(self, name, args=None):
+        if not self.enabled:
+            return
+        event = {"name": name, "ph": "i", "s": "p", "ts": _now_us(), "pid": self.pid, "tid": threading.get_ident()}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def span(self, name, args=None):
+        """Context manager recording one span (no-op when disabled)"""
+        return _Span(self, name, args)
+
+    def install_tk_hooks(self, root, heartbeat_ms=16):
+        """Trace every `after` callback and watch the mainloop for stalls"""
+        if not self.enabled or self._original_after:
+            return
+        original_after = tk.Misc.after
+        self._original_after = original_after
+        tracer = self
+
+        def traced_after(widget, ms, func=None, *args):
+            if func is None:
+                return original_after(widget, ms)
+            name = "after:" + getattr(func, "__qualname__", getattr(func, "__name__", "callback"))
+
+            def callback(*cb_args):
+                start = _now_us()
+                try:
+                    return func(*cb_args)
+                finally:
+                    tracer.record(name, start, _now_us(), {"delay_ms": ms})
+            callback.__name__ = name
+            return original_after(widget, ms, callback, *args)
+
+        tk.Misc.after = traced_after
+        self._heartbeat(root, heartbeat_ms, _now_us())
+
+    def _heartbeat(self, root, interval_ms, scheduled_us):
+        # A late heartbeat means the mainloop was busy (or blocked) in between
+        now = _now_us()
+        late_ms = (now - scheduled_us) / 1000.0 - interval_ms
+        if late_ms > self.stall_ms:
+            self.record("mainloop_stall", scheduled_us + interval_ms * 1000, now, {"late_ms": round(late_ms, 2)})
+        try:
+            self._original_after(root, interval_ms, self._heartbeat, root, interval_ms, now)
+        except tk.TclError:
+            pass  # root destroyed
+
+    def summary(self):
+        """Per-span count, percentiles and histogram (milliseconds)"""
+        result = {}
+        for name, values in sorted(self.durations.items()):
+            values = sorted(values)
+            n = len(values)
+            counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+            bucket = 0
+            for v in values:
+                while bucket < len(HISTOGRAM_BUCKETS) and v > HISTOGRAM_BUCKETS[bucket]:
+                    bucket += 1
+                counts[bucket] += 1
+            result[name] = {
+                "count": n,
+                "total_ms": round(sum(values), 3),
+                "p50_ms": round(values[n // 2], 3),
+                "p95_ms": round(values[min(n - 1, int(n * 0.95))], 3),
+                "max_ms": round(values[-1], 3),
+                "histogram": {
+                    ("<=%gms" % b if i < len(HISTOGRAM_BUCKETS) else ">%gms" % HISTOGRAM_BUCKETS[-1]): c
+                    for i, (b, c) in enumerate(zip(HISTOGRAM_BUCKETS + [None], counts)) if c
+                }
+            }
+        return result
+
+    def write(self):
+        if not self.enabled or not self.path:
+            return
+        try:
+            with open(self.path, "w") as f:
+                json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+            summary = self.summary()
+            with open(self.path + ".summary.json", "w") as f:
+                json.dump(summary, f, indent=2)
+        except Exception as e:
+            print(f"Error writing trace: {e}")
+            return
+        print(f"Trace written to {self.path}")
+        for name, stats in summary.items():
+            print(f"  {name:40s} n={stats['count']:<6d} p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms max={stats['max_ms']:.2f}ms")
+        self.path = None  # Only write once (mainloop exit and atexit)
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        if self.tracer.enabled:
+            self.start = _now_us()
+        return self
+
+    def __exit__(self, *exc):
+        if self.tracer.enabled:
+            self.tracer.record(self.name, self.start, _now_us(), self.args)
+        return False
+
+
+TRACER = Tracer()
+
+
+def traced(name):
+    """Decorator recording a span for each call while tracing is enabled"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            start = _now_us()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                TRACER.record(name, start, _now_us())
+        return wrapper
+    return decorator
+
+
+def enable_from_env():
+    path = os.environ.get(TRACE_ENV)
+    if path:
+        TRACER.enable(path, stall_ms=float(os.environ.get(STALL_ENV, 50)))
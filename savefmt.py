@@ -0,0 +1,273 @@
+"""Compact binary save format.
+
+Layout:
+
+    b"BSNS"  magic
+    u8       format version (1)
+    u8       codec: 0 = none, 1 = zlib, 2 = lzma
+    ...      body, compressed with the codec:
+        varint length + UTF-8 JSON of everything except chat_history
+        chat_history as a stream of events until the end of the body:
+            varint tag = (ref << 1) | is_user
+            ref == 0: a new string follows (varint length + UTF-8) and is
+                      added to the string table
+            ref >= 1: repeats string table entry ref - 1
+
+Node texts and choice labels repeat constantly in a long history, so each
+distinct string is stored once and every later occurrence costs a byte
+or two. The table is built as the stream is read, so decoding streams
+through the file in chunks without holding the compressed and
+decompressed copies at once.
+
+load() falls back to reading legacy JSON saves.
+
+    python savefmt.py --bench     # size and load time vs JSON
+"""
+import io
+import json
+import lzma
+import time
+import zlib
+
+MAGIC = b"BSNS"
+VERSION = 1
+CODECS = {"none": 0, "zlib": 1, "lzma": 2}
+READ_CHUNK = 64 * 1024
+
+
+class SaveFormatError(ValueError):
+    """Raised for saves that are neither valid binary nor JSON"""
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _compressor(codec):
+    if codec == 1:
+        return zlib.compressobj(6)
+    if codec == 2:
+        return lzma.LZMACompressor()
+    return None
+
+
+def _decompressor(codec):
+    if codec == 1:
+        return zlib.decompressobj()
+    if codec == 2:
+        return lzma.LZMADecompressor()
+    if codec == 0:
+        return None
+    raise SaveFormatError(f"unknown codec {codec}")
+
+
+def dumps(data, codec="zlib"):
+    """Encode a save dict (current_node, state, chat_history, ...) to bytes"""
+    codec_id = CODECS[codec]
+    meta = {k: v for k, v in data.items() if k != "chat_history"}
+    body = bytearray()
+    meta_bytes = json.dumps(meta).encode("utf-8")
+    _write_varint(body, len(meta_bytes))
+    body += meta_bytes
+
+    table = {}
+    for msg in data.get("chat_history", []):
+        text = msg["text"]
+        is_user = 1 if msg.get("is_user") else 0
+        ref = table.get(text)
+        if ref is None:
+            table[text] = len(table) + 1
+            _write_varint(body, is_user)
+            encoded = text.encode("utf-8")
+            _write_varint(body, len(encoded))
+            body += encoded
+        else:
+            _write_varint(body, (ref << 1) | is_user)
+
+    compressor = _compressor(codec_id)
+    payload = compressor.compress(bytes(body)) + compressor.flush() if compressor else bytes(body)
+    return MAGIC + bytes((VERSION, codec_id)) + payload
+
+
+def dump(data, f, codec="zlib"):
+    f.write(dumps(data, codec))
+
+
+class _BodyReader:
+    """Pulls decompressed bytes from a file object on demand"""
+    def __init__(self, f, codec):
+        self.f = f
+        self.decompressor = _decompressor(codec)
+        self.buf = b""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, need):
+        while len(self.buf) - self.pos < need and not self.eof:
+            chunk = self.f.read(READ_CHUNK)
+            if not chunk:
+                self.eof = True
+                if self.decompressor is not None and hasattr(self.decompressor, "flush"):
+                    chunk = self.decompressor.flush()
+                else:
+                    break
+            elif self.decompressor is not None:
+                chunk = self.decompressor.decompress(chunk)
+            self.buf = self.buf[self.pos:] + chunk
+            self.pos = 0
+        return len(self.buf) - self.pos >= need
+
+    def at_end(self):
+        return not self._fill(1)
+
+    def read(self, n):
+        if not self._fill(n):
+            raise SaveFormatError("truncated save")
+        data = self.buf[self.pos:self.pos + n]
+        self.pos += n
+        return data
+
+    def varint(self):
+        result = 0
+        shift = 0
+        while True:
+            if not self._fill(1):
+                raise SaveFormatError("truncated save")
+            byte = self.buf[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return result
+            shift += 7
+
+
+def _open_binary(f):
+    header = f.read(6)
+    if len(header) < 6 or header[:4] != MAGIC:
+        raise SaveFormatError("not a binary save")
+    if header[4] != VERSION:
+        raise SaveFormatError(f"unsupported save version {header[4]}")
+    reader = _BodyReader(f, header[5])
+    meta = json.loads(reader.read(reader.varint()).decode("utf-8"))
+    return meta, reader
+
+
+def _iter_events(reader):
+    table = []
+    while not reader.at_end():
+        # Fast path: repeated strings with one- or two-byte tags, straight off the buffer
+        reader._fill(READ_CHUNK)
+        buf = reader.buf
+        pos = reader.pos
+        end = len(buf) - 2
+        while pos < end:
+            tag = buf[pos]
+            if tag & 0x80:
+                second = buf[pos + 1]
+                if second & 0x80:
+                    break
+                tag = (tag & 0x7F) | (second << 7)
+                size = 2
+            else:
+                size = 1
+            if tag < 2:
+                break  # New string; handled below
+            pos += size
+            yield {"text": table[(tag >> 1) - 1], "is_user": bool(tag & 1)}
+        reader.pos = pos
+        if reader.at_end():
+            break
+
+        tag = reader.varint()
+        ref, is_user = tag >> 1, bool(tag & 1)
+        if ref == 0:
+            text = reader.read(reader.varint()).decode("utf-8")
+            table.append(text)
+        else:
+            text = table[ref - 1]
+        yield {"text": text, "is_user": is_user}
+
+
+def iter_history(f):
+    """Stream chat_history messages from a binary save without loading it all"""
+    _, reader = _open_binary(f)
+    yield from _iter_events(reader)
+
+
+def load(f):
+    """Read a save from a binary file object; legacy JSON saves are accepted too"""
+    start = f.tell()
+    if f.read(4) != MAGIC:
+        f.seek(start)
+        try:
+            return json.loads(f.read())
+        except ValueError as e:
+            raise SaveFormatError(f"unreadable save: {e}")
+    f.seek(start)
+    meta, reader = _open_binary(f)
+    meta["chat_history"] = list(_iter_events(reader))
+    return meta
+
+
+def loads(data):
+    return load(io.BytesIO(data))
+
+
+def _sample_save(entries):
+    from story import Playthrough
+    import random
+    rng = random.Random(1)
+    play = Playthrough()
+    history = []
+    text = play.enter()
+    while len(history) < entries:
+        if text is None:
+            play.node_id = "start"
+            text = play.enter()
+            continue
+        history.append({"text": text, "is_user": False})
+        choice = play.choose(rng.randrange(len(play.choices)))
+        history.append({"text": choice.label, "is_user": True})
+        text = play.enter()
+    return {"current_node": play.node_id, "state": dict(play.state), "chat_history": history[:entries]}
+
+
+def bench(sizes=(1000, 100000)):
+    results = []
+    for entries in sizes:
+        data = _sample_save(entries)
+        encoded = {"json": json.dumps(data).encode("utf-8")}
+        for codec in CODECS:
+            encoded[codec] = dumps(data, codec)
+        for name, blob in encoded.items():
+            start = time.perf_counter()
+            if name == "json":
+                decoded = json.loads(blob)
+            else:
+                decoded = loads(blob)
+            elapsed = time.perf_counter() - start
+            assert decoded["chat_history"] == data["chat_history"]
+            results.append({
+                "entries": entries,
+                "format": name if name == "json" else f"binary/{name}",
+                "bytes": len(blob),
+                "ratio_vs_json": round(len(blob) / len(encoded["json"]), 4),
+                "load_ms": round(elapsed * 1000, 3)
+            })
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Binary save format tools")
+    parser.add_argument("--bench", action="store_true", help="compare size and load time with JSON")
+    args = parser.parse_args()
+    if args.bench:
+        for row in bench():
+            print(f"{row['entries']:>7} entries  {row['format']:<14} {row['bytes']:>10} bytes  "
+                  f"x{row['ratio_vs_json']:<7} {row['load_ms']:>9.3f} ms")
+    else:
+        parser.print_help()
@@ -0,0 +1,146 @@
+"""Named save slots with a small metadata index.
+
+Each slot's full save (current node, state, chat history) lives in its
+own file under saves/. saves/index.json holds one short entry per slot:
+the player's name for it, current node, timestamp, message count and
+endings reached. The title screen only needs the index, so listing slots
+never opens a full save.
+
+A new game may replace an existing slot (the player picks which when all
+MAX_SLOTS are in use). The replaced slot is only deleted once the new
+one has been written, so backing out before the first save loses
+nothing.
+
+Slot bodies are JSON by default, or the compact binary format from
+savefmt.py when BANDERSNATCH_SAVE_FORMAT=binary (zlib, or "binary-lzma").
+Either kind is read back regardless of the current setting.
+
+An old single savegame.json is moved into a slot the first time the
+slots are listed.
+"""
+import json
+import os
+import time
+
+import savefmt
+
+SAVE_DIR = "saves"
+INDEX_FILE = "index.json"
+LEGACY_SAVE = "savegame.json"
+MAX_SLOTS = 5
+FORMAT_ENV = "BANDERSNATCH_SAVE_FORMAT"
+
+
+def _write_json(path, data):
+    # Write to a temp file and swap it in, so a crash never leaves half a save
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _write_bytes(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class SaveSlots:
+    def __init__(self, directory=SAVE_DIR, max_slots=MAX_SLOTS, save_format=None):
+        self.directory = directory
+        self.max_slots = max_slots
+        self.save_format = save_format or os.environ.get(FORMAT_ENV, "json")
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._index = None
+        self._pending = {} # New slot -> (name, slot it replaces), until its first write
+
+    def _slot_path(self, slot, ext=".json"):
+        return os.path.join(self.directory, f"{slot}{ext}")
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self.index_path) as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        _write_json(self.index_path, self._index)
+
+    def list_slots(self):
+        """Slot metadata from the index only, most recently saved first"""
+        self._migrate_legacy()
+        index = self._load_index()
+        return sorted(index.values(), key=lambda meta: meta["timestamp"], reverse=True)
+
+    def is_full(self):
+        return len(self._load_index()) >= self.max_slots
+
+    def new_slot(self, name=None, replaces=None):
+        """Id for a fresh slot called `name`; `replaces` is deleted once the new slot is first written"""
+        index = self._load_index()
+        number = 1
+        while f"slot-{number}" in index or f"slot-{number}" in self._pending:
+            number += 1
+        slot = f"slot-{number}"
+        self._pending[slot] = (name, replaces)
+        return slot
+
+    def write(self, slot, data, endings=()):
+        """Write a slot's full save and refresh its index entry"""
+        os.makedirs(self.directory, exist_ok=True)
+        if self.save_format.startswith("binary"):
+            codec = "lzma" if self.save_format == "binary-lzma" else "zlib"
+            _write_bytes(self._slot_path(slot, ".sav"), savefmt.dumps(data, codec))
+            stale = self._slot_path(slot, ".json")
+        else:
+            _write_json(self._slot_path(slot), data)
+            stale = self._slot_path(slot, ".sav")
+        if os.path.exists(stale):
+            os.remove(stale)
+        index = self._load_index()
+        name, replaces = self._pending.pop(slot, (None, None))
+        index[slot] = {
+            "slot": slot,
+            "name": name or index.get(slot, {}).get("name") or slot,
+            "current_node": data.get("current_node"),
+            "timestamp": time.time(),
+            "messages": len(data.get("chat_history", [])),
+            "endings": list(endings)
+        }
+        self._save_index()
+        if replaces and replaces != slot:
+            self.delete(replaces)
+
+    def read(self, slot):
+        path = self._slot_path(slot, ".sav")
+        if not os.path.exists(path):
+            path = self._slot_path(slot, ".json")
+        with open(path, "rb") as f:
+            return savefmt.load(f)
+
+    def delete(self, slot):
+        index = self._load_index()
+        if index.pop(slot, None) is not None:
+            self._save_index()
+        for ext in (".sav", ".json"):
+            try:
+                os.remove(self._slot_path(slot, ext))
+            except OSError:
+                pass
+
+    def _migrate_legacy(self):
+        if not os.path.exists(LEGACY_SAVE):
+            return
+        try:
+            with open(LEGACY_SAVE) as f:
+                data = json.load(f)
+            slot = self.new_slot("Saved game")
+            self.write(slot, data, endings=data.get("endings", []))
+            os.remove(LEGACY_SAVE)
+        except Exception as e:
+            print(f"Error migrating {LEGACY_SAVE}: {e}")
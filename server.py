@@ -0,0 +1,385 @@
+"""Multi-session story server.
+
+Hosts the story for many players from one process using asyncio and the
+standard library only. Open http://127.0.0.1:8765/ for a minimal browser
+client, or connect any WebSocket client to /ws (add ?session=<id> to
+resume).
+
+Messages are JSON text frames:
+
+    server -> client
+        {"type": "session", "id": "..."}
+        {"type": "history", "messages": [{"text": ..., "is_user": ...}, ...]}
+        {"type": "text", "chunk": "..."}        node text, typewriter style
+        {"type": "choices", "choices": ["...", ...]}
+        {"type": "end"}                          past the end of the story
+        {"type": "error", "message": "..."}
+
+    client -> server
+        {"type": "choose", "index": 0}
+
+Sessions are kept in a bounded in-memory LRU; idle ones are spilled to
+SQLite (--db) in the same layout as the GUI's savegame.json and reloaded
+on their next visit. GET /stats reports the store's hit rate, evictions
+and rehydration latency.
+
+    python server.py [--host 127.0.0.1] [--port 8765]
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import secrets
+import struct
+import time
+from urllib.parse import urlsplit, parse_qs
+
+from story import Playthrough, GameState, reset_state
+from sessionstore import SessionStore
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_MESSAGE = 64 * 1024
+MAX_HEADER_LINES = 100
+MAX_HISTORY = 300 # Transcript messages kept per session, like the GUI's MAX_TRANSCRIPT
+
+
+class Session:
+    """One player's progress: the story walker plus the transcript"""
+    __slots__ = ("id", "play", "history", "streaming", "last_active")
+
+    def __init__(self, session_id, play=None, history=None):
+        self.id = session_id
+        self.play = play or Playthrough()
+        self.history = history if history is not None else []
+        self.streaming = False
+        self.last_active = time.monotonic()
+
+    def begin(self):
+        """Enter the current node; returns its text (None past the end of the story)"""
+        text = self.play.enter()
+        if text is not None:
+            self.history.append({"text": text, "is_user": False})
+            self._trim()
+        return text
+
+    def _trim(self):
+        # Players looping the story would otherwise grow every save without bound
+        excess = len(self.history) - MAX_HISTORY
+        if excess > 0:
+            del self.history[:excess]
+
+    def choose(self, index):
+        """Take a choice and enter the next node; returns (label, text)"""
+        if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < len(self.play.choices):
+            raise ValueError(f"no choice {index!r} here")
+        choice = self.play.choose(index)
+        self.history.append({"text": choice.label, "is_user": True})
+        self._trim()
+        self.last_active = time.monotonic()
+        if choice.target == "quit":
+            return choice.label, None
+        return choice.label, self.begin()
+
+    def choice_labels(self):
+        return [c.label for c in self.play.choices]
+
+    def to_save(self):
+        """Same layout as BandersnatchApp.save_game; a snapshot, safe to serialize on another thread"""
+        return {
+            "current_node": self.play.node_id,
+            "state": dict(self.play.state),
+            "chat_history": list(self.history)
+        }
+
+    @staticmethod
+    def new_id():
+        return secrets.token_urlsafe(12)
+
+    @classmethod
+    def from_save(cls, session_id, data):
+        state = reset_state(GameState())
+        state.update(data.get("state", {}))
+        play = Playthrough(state=state, node_id=data.get("current_node", "start"))
+        session = cls(session_id, play, data.get("chat_history", []))
+        # Rebuild the choice list without re-applying the node's entry effects
+        node = play.node
+        play.choices = node.available_choices(state) if node else []
+        return session
+
+
+def text_chunks(text, size):
+    """Split text into typewriter chunks of `size` characters"""
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def encode_frame(payload, opcode=0x1):
+    """Server-to-client WebSocket frame (unmasked, unfragmented)"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def encode_message(message):
+    return encode_frame(json.dumps(message).encode("utf-8"))
+
+
+async def read_frame(reader):
+    """Read one WebSocket frame; returns (opcode, payload)"""
+    head = await reader.readexactly(2)
+    opcode = head[0] & 0x0F
+    masked = head[1] & 0x80
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > MAX_MESSAGE:
+        raise ValueError("message too large")
+    mask = await reader.readexactly(4) if masked else None
+    payload = await reader.readexactly(length)
+    if mask and length:
+        key = (mask * (length // 4 + 1))[:length]
+        payload = (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
+    return opcode, payload
+
+
+async def read_request(reader):
+    """Parse an HTTP request head; returns (method, target, headers)"""
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    parts = request_line.split()
+    if len(parts) != 3:
+        raise ValueError("bad request line")
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return parts[0], parts[1], headers
+
+
+def http_response(status, body=b"", content_type="text/plain; charset=utf-8"):
+    return (
+        f"HTTP/1.1 {status}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode("latin-1") + body
+
+
+def upgrade(writer, headers):
+    """Answer a WebSocket upgrade request; returns False (after a 400) if it isn't a valid one"""
+    key = headers.get("sec-websocket-key")
+    if not key:
+        writer.write(http_response("400 Bad Request", b"missing key"))
+        return False
+    accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("latin-1")).digest()).decode("latin-1")
+    writer.write((
+        "HTTP/1.1 101 Switching Protocols\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+    ).encode("latin-1"))
+    return True
+
+
+def open_store(path, capacity=10000):
+    return SessionStore(path, dump=Session.to_save, load=Session.from_save, capacity=capacity)
+
+
+class StoryServer:
+    def __init__(self, store, chunk_chars=3, chunk_ms=50):
+        self.store = store
+        self.chunk_chars = chunk_chars
+        self.chunk_ms = chunk_ms
+
+    async def handle(self, reader, writer):
+        try:
+            method, target, headers = await read_request(reader)
+            url = urlsplit(target)
+            if url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self.handle_websocket(reader, writer, headers, parse_qs(url.query))
+            elif url.path == "/stats" and method == "GET":
+                body = json.dumps(self.store.stats()).encode("utf-8")
+                writer.write(http_response("200 OK", body, "application/json"))
+            elif url.path == "/" and method == "GET":
+                writer.write(http_response("200 OK", CLIENT_HTML.encode("utf-8"), "text/html; charset=utf-8"))
+            else:
+                writer.write(http_response("404 Not Found", b"not found"))
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_websocket(self, reader, writer, headers, query):
+        if not upgrade(writer, headers):
+            return
+
+        session = self.store.acquire(query.get("session", [""])[0])
+        resumed = session is not None
+        if not resumed:
+            session = self.store.add(Session(Session.new_id()), pin=True)
+        writer.write(encode_message({"type": "session", "id": session.id}))
+
+        stream = None
+        if resumed:
+            writer.write(encode_message({"type": "history", "messages": session.history}))
+            writer.write(self._choices_frame(session))
+        else:
+            stream = self._start_stream(writer, session, session.begin(), None)
+
+        try:
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == 0x8:  # close
+                    writer.write(encode_frame(b"", 0x8))
+                    break
+                if opcode == 0x9:  # ping
+                    writer.write(encode_frame(payload, 0xA))
+                    continue
+                if opcode != 0x1:
+                    continue
+                try:
+                    message = json.loads(payload)
+                except ValueError:
+                    continue
+                if not isinstance(message, dict):
+                    continue
+                if message.get("type") != "choose" or session.streaming:
+                    continue  # Clicks while text is still typing are ignored, as in the GUI
+                try:
+                    _, text = session.choose(message.get("index"))
+                except ValueError as e:
+                    writer.write(encode_message({"type": "error", "message": str(e)}))
+                    continue
+                if text is None and session.play.node_id == "quit":
+                    break
+                stream = self._start_stream(writer, session, text, stream)
+        finally:
+            if stream:
+                stream.cancel()
+            session.streaming = False # A stream cancelled before it started never clears it
+            self.store.release(session)
+
+    def _start_stream(self, writer, session, text, previous):
+        # Mark the session busy now, not when the task first runs: a packet can carry several
+        # choose frames, and read_frame hands them over without yielding in between
+        session.streaming = True
+        if previous:
+            previous.cancel()
+        return asyncio.ensure_future(self.stream_text(writer, session, text))
+
+    def _choices_frame(self, session):
+        if session.play.node is None:
+            return encode_message({"type": "end"})
+        return encode_message({"type": "choices", "choices": session.choice_labels()})
+
+    async def stream_text(self, writer, session, text):
+        """Type `text` out to the client, then send the choices; the caller sets session.streaming"""
+        try:
+            if text is not None:
+                for chunk in text_chunks(text, self.chunk_chars):
+                    writer.write(encode_message({"type": "text", "chunk": chunk}))
+                    await writer.drain()
+                    if self.chunk_ms:
+                        await asyncio.sleep(self.chunk_ms / 1000.0)
+            writer.write(self._choices_frame(session))
+            await writer.drain()
+        except ConnectionError:
+            return
+        finally:
+            session.streaming = False
+        self.store.save(session)
+
+
+CLIENT_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Bandersnatch</title>
+<style>
+body { background: #0d1117; color: #000; font-family: 'Special Elite', 'Courier New', monospace; max-width: 640px; margin: 2em auto; }
+.msg { background: #fff; border-radius: 15px; padding: 10px; margin: 4px 0; white-space: pre-wrap; max-width: 480px; }
+.user { background: #d9fdd3; margin-left: auto; }
+button { background: #333; color: #fff; border: 0; border-radius: 22px; padding: 12px 24px; margin: 5px; font: inherit; font-weight: bold; }
+</style></head>
+<body><div id="log"></div><div id="choices"></div>
+<script>
+const log = document.getElementById("log"), choices = document.getElementById("choices");
+const id = localStorage.getItem("bandersnatch-session") || "";
+const ws = new WebSocket(`ws://${location.host}/ws?session=${id}`);
+let current = null;
+function bubble(text, user) {
+  const div = document.createElement("div");
+  div.className = "msg" + (user ? " user" : "");
+  div.textContent = text;
+  log.appendChild(div);
+  window.scrollTo(0, document.body.scrollHeight);
+  return div;
+}
+ws.onmessage = (e) => {
+  const m = JSON.parse(e.data);
+  if (m.type === "session") localStorage.setItem("bandersnatch-session", m.id);
+  if (m.type === "history") m.messages.forEach((h) => bubble(h.text, h.is_user));
+  if (m.type === "text") { if (!current) current = bubble("", false); current.textContent += m.chunk; }
+  if (m.type === "end") { current = null; choices.textContent = "End of Line."; }
+  if (m.type === "choices") {
+    current = null;
+    choices.innerHTML = "";
+    m.choices.forEach((label, i) => {
+      const b = document.createElement("button");
+      b.textContent = label;
+      b.onclick = () => { choices.innerHTML = ""; bubble(label, true); ws.send(JSON.stringify({type: "choose", index: i})); };
+      choices.appendChild(b);
+    });
+  }
+};
+</script></body></html>
+"""
+
+
+async def flush_periodically(store, interval=1.0):
+    # Batch session writes instead of committing on every choice
+    while True:
+        await asyncio.sleep(interval)
+        await store.flush_async()
+
+
+async def serve(host, port, store, chunk_chars, chunk_ms):
+    story_server = StoryServer(store, chunk_chars=chunk_chars, chunk_ms=chunk_ms)
+    server = await asyncio.start_server(story_server.handle, host, port)
+    flusher = asyncio.ensure_future(flush_periodically(store))
+    print(f"Serving Bandersnatch on http://{host}:{port}/")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        flusher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandersnatch multi-session server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default="sessions.db", help="SQLite file idle sessions are spilled to")
+    parser.add_argument("--max-resident", type=int, default=10000, help="sessions kept in memory before spilling")
+    parser.add_argument("--chunk-chars", type=int, default=3, help="characters per typewriter chunk")
+    parser.add_argument("--chunk-ms", type=float, default=50, help="delay between chunks, 0 to send at once")
+    args = parser.parse_args()
+
+    store = open_store(args.db, capacity=args.max_resident)
+    try:
+        asyncio.run(serve(args.host, args.port, store, args.chunk_chars, args.chunk_ms))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Session store for server mode: a bounded in-memory LRU backed by SQLite.
+
+The most recently used sessions stay in memory. When there are more than
+`capacity`, the least recently used ones that nobody is connected to are
+serialized and spilled to a local SQLite database (WAL mode). Writes are
+batched and committed by flush(). A later get() for a spilled session
+rehydrates it transparently.
+
+All writes go through one worker thread, in order. flush_async() lets the
+event loop carry on while changed sessions are serialized and committed
+there; only taking their snapshots (`dump`) happens on the caller's thread.
+
+The store doesn't know what a session is: it is given `dump` (session ->
+JSON-able dict) and `load` (session_id, dict -> session) callables, and
+only needs sessions to have an `id`.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SessionStore:
+    def __init__(self, path, dump, load, capacity=10000, batch_size=500):
+        self.dump = dump
+        self.load = load
+        self.capacity = capacity
+        self.batch_size = batch_size
+
+        self.resident = OrderedDict()  # session_id -> session, least recently used first
+        self.pinned = {}               # session_id -> open connection count
+        self.dirty = set()             # resident sessions changed since the last flush
+        self.pending = {}              # session_id -> serialized data not yet committed
+        self.writing = {}              # spilled session_id -> serialized data in a batch being committed
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rehydrations = 0
+        self.rehydrate_ms_total = 0.0
+        self.rehydrate_ms_max = 0.0
+        self.commits = 0
+
+        # Written from the worker thread, read (rehydration) from the caller's
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db_lock = threading.Lock()
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sessionstore") # One, so batches land in order
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)")
+        self.db.commit()
+
+    def __len__(self):
+        return len(self.resident)
+
+    def add(self, session, pin=False):
+        """Store a new session; with pin=True it stays resident until release()"""
+        self.resident[session.id] = session
+        self.dirty.add(session.id)
+        if pin:
+            # Pin before evicting, or a full store would spill the session it was just given
+            self.pin(session)
+        self._evict()
+        return session
+
+    def get(self, session_id, pin=False):
+        """Return the session (rehydrating it if it was spilled), or None"""
+        if not session_id:
+            return None
+        session = self.resident.get(session_id)
+        if session is not None:
+            self.hits += 1
+            self.resident.move_to_end(session_id)
+            if pin:
+                self.pin(session)
+            return session
+
+        self.misses += 1
+        start = time.perf_counter()
+        data = self.pending.get(session_id) or self.writing.get(session_id)
+        if data is None:
+            with self.db_lock:
+                row = self.db.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            data = row[0]
+        session = self.load(session_id, json.loads(data))
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        self.rehydrations += 1
+        self.rehydrate_ms_total += elapsed_ms
+        self.rehydrate_ms_max = max(self.rehydrate_ms_max, elapsed_ms)
+
+        self.resident[session_id] = session
+        if pin:
+            self.pin(session)
+        self._evict()
+        return session
+
+    def acquire(self, session_id):
+        """get() and keep the session resident until release()"""
+        return self.get(session_id, pin=True)
+
+    def pin(self, session):
+        self.pinned[session.id] = self.pinned.get(session.id, 0) + 1
+
+    def release(self, session):
+        count = self.pinned.get(session.id, 0) - 1
+        if count > 0:
+            self.pinned[session.id] = count
+        else:
+            self.pinned.pop(session.id, None)
+        self.save(session)
+        self._evict()
+
+    def save(self, session):
+        """Mark a session as changed; it is written on the next flush()"""
+        if self.resident.get(session.id) is session:
+            self.dirty.add(session.id)
+        else:
+            # Already spilled: flush() only dumps resident sessions, so keep its current form here
+            self.pending[session.id] = json.dumps(self.dump(session))
+        if len(self.dirty) + len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def _evict(self):
+        if len(self.resident) <= self.capacity:
+            return
+        # Walk from the least recently used end, skipping sessions with live connections
+        excess = len(self.resident) - self.capacity
+        victims = []
+        for session_id in self.resident:
+            if len(victims) >= excess:
+                break
+            if session_id not in self.pinned:
+                victims.append(session_id)
+        for session_id in victims:
+            session = self.resident.pop(session_id)
+            self.pending[session_id] = json.dumps(self.dump(session))
+            self.dirty.discard(session_id)
+            self.evictions += 1
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def _take_batch(self):
+        """Spilled sessions' data plus snapshots of the changed resident ones, for _write()"""
+        spilled = dict(self.pending)
+        rows = list(spilled.items())
+        rows.extend((sid, self.dump(self.resident[sid])) for sid in self.dirty if sid in self.resident)
+        self.writing.update(spilled) # Still readable by get() until committed
+        self.pending.clear()
+        self.dirty.clear()
+        return spilled, rows
+
+    def _write(self, rows):
+        # Worker thread: serialize the snapshots and commit
+        now = time.time()
+        values = [(sid, data if isinstance(data, str) else json.dumps(data), now) for sid, data in rows]
+        with self.db_lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO sessions (id, data, updated) VALUES (?, ?, ?)", values)
+
+    def _written(self, spilled):
+        for sid, data in spilled.items():
+            if self.writing.get(sid) is data:
+                del self.writing[sid]
+        self.commits += 1
+
+    def flush(self):
+        """Commit spilled and changed sessions in one transaction, waiting for it"""
+        if not self.pending and not self.dirty:
+            return
+        spilled, rows = self._take_batch()
+        self.writer.submit(self._write, rows).result()
+        self._written(spilled)
+
+    async def flush_async(self):
+        """flush() with serialization and the commit off the event loop"""
+        if not self.pending and not self.dirty:
+            return
+        spilled, rows = self._take_batch()
+        await asyncio.wrap_future(self.writer.submit(self._write, rows))
+        self._written(spilled)
+
+    def close(self):
+        self.dirty.update(self.resident)
+        self.flush()
+        self.writer.shutdown()
+        self.db.close()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "resident": len(self.resident),
+            "capacity": self.capacity,
+            "pinned": len(self.pinned),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "rehydrations": self.rehydrations,
+            "rehydrate_ms_avg": round(self.rehydrate_ms_total / self.rehydrations, 3) if self.rehydrations else None,
+            "rehydrate_ms_max": round(self.rehydrate_ms_max, 3),
+            "pending_writes": len(self.pending) + len(self.dirty),
+            "commits": self.commits
+        }
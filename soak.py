@@ -0,0 +1,117 @@
+"""Memory soak run: drive the real GUI through thousands of transitions
+and fail if anything keeps growing.
+
+The app runs at its normal pacing on a VirtualClock, so typing, delays
+and blinking all happen in simulated time and 10k transitions take
+minutes rather than days. Before each choice the player "thinks" for a
+random 0.5-3 s of virtual time, during which blink, scroll, speculation
+and layout timers fire and then get cancelled by the transition, as in
+real play. Choices are picked at random; endings and "End of Line"
+restarts are part of the loop, as on a kiosk. Every
+--sample-every transitions a MemoryWatch sample (RSS, tracemalloc,
+widget count, pending timers, transcript and checkpoint sizes) is
+appended to the output series, and at the end memwatch.find_growth()
+checks that each metric levelled off.
+
+    python soak.py [--transitions 10000] [--sample-every 250] [-o soak.jsonl]
+
+Needs a display for Tk. Saves and caches go to a temporary directory.
+Exits 1 if a metric grew without bound (or the run got stuck), 2 if
+there is no display.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import tkinter as tk
+import tracemalloc
+
+METRICS = [
+    "rss_bytes", "traced_bytes", "widgets", "pending_after",
+    "chat_history", "bubble_rows", "checkpoints", "button_pool", "layout_entries"
+]
+# Absolute allowances on top of the relative tolerance, for metrics that wobble
+SLACK = {"rss_bytes": 16 * 1024 * 1024, "traced_bytes": 4 * 1024 * 1024, "pending_after": 5, "widgets": 10}
+
+
+def run(transitions, sample_every, output, seed=1):
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("BANDERSNATCH_TELEMETRY", "0")
+    from clock import VirtualClock
+    from memwatch import MemoryWatch, find_growth, load_series
+    from story import COMPILED_NODES
+
+    output = os.path.abspath(output)
+    if os.path.exists(output):
+        os.remove(output)
+    workdir = tempfile.mkdtemp(prefix="bandersnatch-soak-")
+    cwd = os.getcwd()
+    os.chdir(workdir) # Saves and the layout cache stay out of the checkout
+    try:
+        import app as game
+        rng = random.Random(seed)
+        try:
+            root = tk.Tk()
+        except tk.TclError as e:
+            print(f"Soak run needs a display for Tk: {e}")
+            return 2
+        clock = VirtualClock()
+        app = game.BandersnatchApp(root, clock=clock)
+        tracemalloc.start()
+        watch = MemoryWatch(root, output, clock=clock, counters=app.memory_counters)
+
+        def choices_ready():
+            return not app.input_locked and app.typing is None and bool(app.choices_on_screen)
+
+        app.start_game()
+        done = 0
+        while done < transitions:
+            if not clock.run_until(choices_ready, limit_ms=60 * 1000):
+                if app.current_node not in COMPILED_NODES:
+                    app.restart_game() # "End of Line": what the Restart button does
+                    continue
+                print(f"Stuck at {app.current_node!r} after {done} transitions")
+                return 1
+            clock.advance(rng.uniform(500, 3000)) # Think time: let the timers on screen run
+            choice = app.choices_on_screen[rng.randrange(len(app.choices_on_screen))]
+            app.transition(choice.label, choice.target, choice.apply)
+            done += 1
+            if done % 50 == 0:
+                root.update() # Let Tk process the configure/destroy events piling up
+            if done % sample_every == 0:
+                sample = watch.sample(transitions=done, virtual_ms=clock.now())
+                print(f"{done:>6} transitions  rss={sample['rss_bytes']}  widgets={sample['widgets']}  "
+                      f"after={sample['pending_after']}  history={sample['chat_history']}")
+
+        app.telemetry.stop()
+        root.destroy()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    series = load_series(output)
+    growth = find_growth(series, METRICS, slack=SLACK)
+    # find_growth skips metrics with no data; say so rather than pass them silently
+    unmeasured = [m for m in METRICS if all(row.get(m) is None for row in series)]
+    print(json.dumps({
+        "transitions": transitions, "samples": len(series), "series": output,
+        "growing": growth, "unmeasured": unmeasured
+    }, indent=2))
+    return 1 if growth else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandersnatch memory soak run")
+    parser.add_argument("--transitions", type=int, default=10000)
+    parser.add_argument("--sample-every", type=int, default=250)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", default="soak.jsonl", help="time series of memory samples")
+    args = parser.parse_args()
+    return run(args.transitions, args.sample_every, args.output, args.seed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
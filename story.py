@@ -0,0 +1,507 @@
+"""Story content and the small rules language that drives it.
+
+Nodes are plain data, kept as JSON in chapters/ and loaded a chapter at a
+time as play reaches them (see Chapters). Besides "text", "music" and
+"choices" a node may declare:
+
+    "ending": "name"
+        marks the node as one of the story's endings
+
+    "on_enter": {"set": {...}, "inc": {...}, "add": {...}}
+        effects applied to the game state when the node is entered; "add"
+        puts an item in a list field unless it's already there
+
+    "text": "... {field} ..."
+        a template filled in from the game state
+
+    "text": [{"if": "cereal == 'frosties'", "text": "..."}, ..., {"text": "..."}]
+        variants; the first whose condition holds is used
+
+and a choice may be either a target node id or
+
+    {"to": "node_id", "if": "colin_follow", "set": {...}, "inc": {...}, "add": {...}}
+
+Conditions are small Python-like expressions over state fields (names,
+literals, comparisons, and/or/not). Everything is compiled once at load
+into plain closures, see compile_story(); rendered text is memoized on
+just the state fields each node actually reads.
+"""
+import ast
+import json
+import operator
+import os
+import string
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+# Game State
+DEFAULT_STATE = {
+    "cereal": None,
+    "music": None,
+    "offer": None,
+    "colin_follow": False,
+    "mohan_counter": 0,
+    "inventory": [],
+    "volume": 0.3
+}
+
+
+
+class GameState(dict):
+    """The game state dict, remembering which fields changed since the last checkpoint.
+
+    Values are treated as immutable (effects replace lists rather than
+    appending in place), so snapshots can share them without copying.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dirty = set(self)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.dirty.add(key)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.dirty.add(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        self.dirty.update(self)
+        super().clear()
+
+    def take_changes(self):
+        """Return {field: value} for fields changed since the last call"""
+        changes = {key: self.get(key) for key in self.dirty}
+        self.dirty = set()
+        return changes
+
+
+state = GameState(DEFAULT_STATE)
+
+
+def reset_state(target=None):
+    """Put story fields back to their defaults, keeping the volume setting"""
+    if target is None:
+        target = state
+    volume = target.get("volume", DEFAULT_STATE["volume"])
+    target.clear()
+    target.update(DEFAULT_STATE)
+    target["inventory"] = []
+    target["volume"] = volume
+    return target
+
+
+class StoryError(ValueError):
+    """Raised when story data can't be compiled"""
+
+
+_COMPARISONS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+
+def compile_condition(source):
+    """Compile a condition string to (predicate(state) -> bool, fields it reads)"""
+    try:
+        tree = ast.parse(source, mode="eval").body
+    except SyntaxError as e:
+        raise StoryError(f"Bad condition {source!r}: {e.msg}")
+    fields = set()
+    return _compile_expr(tree, source, fields), frozenset(fields)
+
+
+def _compile_expr(node, source, fields):
+    if isinstance(node, ast.Name):
+        name = node.id
+        fields.add(name)
+        return lambda s: s.get(name)
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda s: value
+    if isinstance(node, (ast.List, ast.Tuple)):
+        items = [_compile_expr(e, source, fields) for e in node.elts]
+        return lambda s: [item(s) for item in items]
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        operand = _compile_expr(node.operand, source, fields)
+        return lambda s: not operand(s)
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_expr(v, source, fields) for v in node.values]
+        if isinstance(node.op, ast.And):
+            return lambda s: all(p(s) for p in parts)
+        return lambda s: any(p(s) for p in parts)
+    if isinstance(node, ast.Compare) and all(type(op) in _COMPARISONS for op in node.ops):
+        left = _compile_expr(node.left, source, fields)
+        steps = [(_COMPARISONS[type(op)], _compile_expr(right, source, fields))
+                 for op, right in zip(node.ops, node.comparators)]
+        if len(steps) == 1:
+            op, right = steps[0]
+            return lambda s: op(left(s), right(s))
+
+        def chained(s):
+            value = left(s)
+            for op, right in steps:
+                other = right(s)
+                if not op(value, other):
+                    return False
+                value = other
+            return True
+        return chained
+    raise StoryError(f"Unsupported expression in condition {source!r}: {ast.dump(node)}")
+
+
+def _add_item(s, key, item):
+    # Each item at most once, so looping through the story doesn't grow the list.
+    # Copy-on-write: never mutate a list that may be shared with a saved snapshot
+    items = s.get(key) or []
+    if item not in items:
+        s[key] = list(items) + [item]
+
+
+def compile_effects(spec, choice=False):
+    """Compile {"set": .., "inc": .., "add": ..} into apply(state), or None if empty.
+
+    A choice's spec also carries its "to" and "if"; anywhere else those are errors.
+    """
+    if not spec:
+        return None
+    steps = []
+    for key, value in spec.get("set", {}).items():
+        steps.append(lambda s, k=key, v=value: s.__setitem__(k, v))
+    for key, amount in spec.get("inc", {}).items():
+        steps.append(lambda s, k=key, n=amount: s.__setitem__(k, (s.get(k) or 0) + n))
+    for key, item in spec.get("add", {}).items():
+        steps.append(lambda s, k=key, v=item: _add_item(s, k, v))
+    unknown = set(spec) - {"set", "inc", "add"} - ({"to", "if"} if choice else set())
+    if unknown:
+        raise StoryError(f"Unknown effect(s): {', '.join(sorted(unknown))}")
+    if not steps:
+        return None
+
+    def apply(s):
+        for step in steps:
+            step(s)
+    return apply
+
+
+def _template_fields(text):
+    try:
+        return {name for _, name, _, _ in string.Formatter().parse(text) if name}
+    except ValueError:
+        return set()  # Unbalanced braces, treat as plain text
+
+
+def _memo_key_value(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+def compile_text(text, cache_size=64):
+    """Compile node text into render(state) -> str"""
+    if callable(text):
+        # Legacy callable text can read anything, so it can't be memoized
+        return lambda s: text()
+    if isinstance(text, str):
+        variants = [(None, text)]
+    else:
+        variants = []
+        for variant in text:
+            cond = variant.get("if")
+            variants.append((compile_condition(cond) if cond else None, variant["text"]))
+
+    fields = set()
+    compiled = []
+    for cond, body in variants:
+        if cond:
+            fields |= cond[1]
+        template_fields = _template_fields(body)
+        fields |= template_fields
+        compiled.append((cond[0] if cond else None, body, bool(template_fields)))
+
+    if not fields:
+        constant = compiled[0][1]
+        return lambda s: constant
+
+    fields = tuple(sorted(fields))
+    memo = {}
+
+    def render(s):
+        key = tuple(_memo_key_value(s.get(f)) for f in fields)
+        try:
+            return memo[key]
+        except (KeyError, TypeError):
+            pass
+        result = ""
+        for predicate, body, is_template in compiled:
+            if predicate is None or predicate(s):
+                result = body.format_map(_StateView(s)) if is_template else body
+                break
+        if len(memo) >= cache_size:
+            memo.clear()
+        try:
+            memo[key] = result
+        except TypeError:
+            pass  # Unhashable field value; just don't memoize this one
+        return result
+    render.fields = fields
+    return render
+
+
+class _StateView(dict):
+    """format_map helper so missing fields render empty instead of raising"""
+    def __init__(self, s):
+        super().__init__(s)
+
+    def __missing__(self, key):
+        return ""
+
+
+class CompiledChoice:
+    __slots__ = ("label", "target", "available", "apply")
+
+    def __init__(self, label, target, available=None, apply=None):
+        self.label = label
+        self.target = target
+        self.available = available
+        self.apply = apply
+
+
+class CompiledNode:
+    __slots__ = ("node_id", "music", "render", "enter", "choices", "ending")
+
+    def __init__(self, node_id, music, render, enter, choices, ending=None):
+        self.node_id = node_id
+        self.music = music
+        self.render = render
+        self.enter = enter
+        self.choices = choices
+        self.ending = ending
+
+    def available_choices(self, s):
+        """Choices whose conditions hold for state `s`, in story order"""
+        return [c for c in self.choices if c.available is None or c.available(s)]
+
+
+def compile_node(node_id, node):
+    try:
+        choices = []
+        for label, spec in node.get("choices", {}).items():
+            if isinstance(spec, str):
+                choices.append(CompiledChoice(label, spec))
+                continue
+            cond = spec.get("if")
+            choices.append(CompiledChoice(
+                label,
+                spec["to"],
+                available=compile_condition(cond)[0] if cond else None,
+                apply=compile_effects(spec, choice=True)
+            ))
+        return CompiledNode(
+            node_id,
+            node.get("music", "normal"),
+            compile_text(node["text"]),
+            compile_effects(node.get("on_enter")),
+            choices,
+            node.get("ending")
+        )
+    except (StoryError, KeyError) as e:
+        raise StoryError(f"Node {node_id!r}: {e}")
+
+
+def compile_story(nodes):
+    """Compile every node once; returns {node_id: CompiledNode}"""
+    return {node_id: compile_node(node_id, node) for node_id, node in nodes.items()}
+
+
+# Story Data
+CHAPTER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chapters")
+MAX_RESIDENT_CHAPTERS = 4
+
+
+class Chapters:
+    """Story nodes split into chapter files under chapters/, loaded on first use.
+
+    chapters/index.json lists each chapter's node ids and the story's
+    endings, so finding a node's chapter (or checking a node exists) never
+    reads a chapter. At most `capacity` chapters stay loaded, least
+    recently used dropped first; prefetch() reads the chapters a node's
+    choices lead into on a background thread.
+    """
+    def __init__(self, directory=CHAPTER_DIR, capacity=MAX_RESIDENT_CHAPTERS):
+        with open(os.path.join(directory, "index.json")) as f:
+            index = json.load(f)
+        self.directory = directory
+        self.capacity = capacity
+        self.first = index.get("first", "start")
+        self.chapter_of = {node_id: name for name, ids in index["chapters"].items() for node_id in ids}
+        self.endings = index.get("endings", {}) # node id -> ending name
+        self.resident = OrderedDict() # chapter name -> (raw nodes, compiled nodes)
+        self.loading = {} # chapter name -> Event, set once a background load finishes
+        self.lock = threading.Lock()
+        self.loads = 0
+        self.raw = _ChapterView(self, 0)
+        self.compiled = _ChapterView(self, 1)
+
+    def chapter(self, name):
+        while True:
+            with self.lock:
+                entry = self.resident.get(name)
+                if entry is not None:
+                    self.resident.move_to_end(name)
+                    return entry
+                pending = self.loading.get(name)
+            if pending is None:
+                return self._load(name)
+            pending.wait()
+
+    def _load(self, name):
+        with open(os.path.join(self.directory, f"{name}.json")) as f:
+            nodes = json.load(f)
+        entry = (nodes, compile_story(nodes))
+        with self.lock:
+            self.loads += 1
+            self.resident[name] = entry
+            self.resident.move_to_end(name)
+            while len(self.resident) > self.capacity:
+                self.resident.popitem(last=False)
+        return entry
+
+    def prefetch(self, node_id):
+        """Start loading the chapters reachable from `node_id`'s choices"""
+        node = self.compiled.get(node_id)
+        if node is None:
+            return
+        for name in {self.chapter_of.get(c.target) for c in node.choices} - {None}:
+            with self.lock:
+                if name in self.resident or name in self.loading:
+                    continue
+                done = self.loading[name] = threading.Event()
+            threading.Thread(target=self._prefetch, args=(name, done), daemon=True).start()
+
+    def _prefetch(self, name, done):
+        try:
+            self._load(name)
+        except Exception as e:
+            print(f"Error prefetching chapter {name}: {e}")
+        finally:
+            with self.lock:
+                del self.loading[name]
+            done.set()
+
+    def check(self):
+        """Compile every chapter and check every choice leads to a known node; returns a list of problems"""
+        problems = []
+        for name in dict.fromkeys(self.chapter_of.values()):
+            try:
+                _, compiled = self.chapter(name)
+            except (OSError, ValueError) as e:
+                problems.append(f"Chapter {name!r}: {e}")
+                continue
+            for node in compiled.values():
+                for choice in node.choices:
+                    if choice.target != "quit" and choice.target not in self.chapter_of:
+                        problems.append(f"Node {node.node_id!r}: choice {choice.label!r} leads to unknown node {choice.target!r}")
+        return problems
+
+
+class _ChapterView(Mapping):
+    """Read-only {node_id: node} across all chapters; part 0 is raw data, 1 compiled"""
+    def __init__(self, chapters, part):
+        self.chapters = chapters
+        self.part = part
+
+    def __getitem__(self, node_id):
+        name = self.chapters.chapter_of[node_id]
+        return self.chapters.chapter(name)[self.part][node_id]
+
+    def __contains__(self, node_id):
+        return node_id in self.chapters.chapter_of
+
+    def __iter__(self):
+        return iter(self.chapters.chapter_of)
+
+    def __len__(self):
+        return len(self.chapters.chapter_of)
+
+
+STORY = Chapters()
+STORY_NODES = STORY.raw
+COMPILED_NODES = STORY.compiled
+
+
+class Playthrough:
+    """One player's walk through the compiled story, independent of any UI"""
+    def __init__(self, nodes=None, state=None, node_id="start"):
+        self.nodes = COMPILED_NODES if nodes is None else nodes
+        self.state = reset_state(GameState()) if state is None else state
+        self.node_id = node_id
+        self.choices = []
+
+    @property
+    def node(self):
+        return self.nodes.get(self.node_id)
+
+    def enter(self):
+        """Apply the current node's effects and return its text (None past the end of the story)"""
+        node = self.node
+        if node is None:
+            self.choices = []
+            return None
+        if node.enter:
+            node.enter(self.state)
+        self.choices = node.available_choices(self.state)
+        return node.render(self.state)
+
+    def choose(self, index):
+        """Take choice `index` of the current node; returns the CompiledChoice"""
+        choice = self.choices[index]
+        if choice.apply:
+            choice.apply(self.state)
+        self.node_id = choice.target
+        return choice
+
+
+class Preview:
+    """What taking a choice would lead to, worked out on a copy of the state"""
+    __slots__ = ("choice", "before", "after", "node", "text", "choices")
+
+    def __init__(self, choice, before, after, node, text, choices):
+        self.choice = choice
+        self.before = before # State after the choice's effects, before the node's on_enter
+        self.after = after # State once the node has been entered
+        self.node = node
+        self.text = text
+        self.choices = choices
+
+
+def preview_choice(choice, s, nodes=None):
+    """Resolve the node behind `choice` (text, next choices) without touching state `s`"""
+    nodes = COMPILED_NODES if nodes is None else nodes
+    trial = GameState(s)
+    if choice.apply:
+        choice.apply(trial)
+    before = dict(trial)
+    node = nodes.get(choice.target)
+    if node is None:
+        return Preview(choice, before, before, None, None, [])
+    if node.enter:
+        node.enter(trial)
+    return Preview(choice, before, dict(trial), node, node.render(trial), node.available_choices(trial))
+
+
+if __name__ == "__main__":
+    problems = STORY.check()
+    for problem in problems:
+        print(problem)
+    print(f"{len(STORY.chapter_of)} nodes in {len(set(STORY.chapter_of.values()))} chapters, {len(problems)} problem(s)")
+    raise SystemExit(1 if problems else 0)
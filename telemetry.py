@@ -0,0 +1,146 @@
+"""Local choice telemetry.
+
+Records (timestamp, session, node, choice, next node, time to decide)
+for every choice into a fixed-size ring buffer. The UI thread only ever
+does a short non-blocking push; if the buffer is full the record is
+dropped and counted. A background thread drains the buffer in batches
+into append-only JSONL files under telemetry/, starting a new file once
+the current one reaches max_file_bytes and keeping the newest max_files.
+
+Set BANDERSNATCH_TELEMETRY=0 to turn it off.
+"""
+import json
+import os
+import threading
+import time
+
+TELEMETRY_ENV = "BANDERSNATCH_TELEMETRY"
+TELEMETRY_DIR = "telemetry"
+
+
+class RingBuffer:
+    """Fixed-capacity FIFO that refuses (rather than blocks on) pushes when full"""
+    def __init__(self, capacity):
+        self.items = [None] * capacity
+        self.capacity = capacity
+        self.head = 0  # next slot to read
+        self.size = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def push(self, item):
+        with self.lock:
+            if self.size == self.capacity:
+                self.dropped += 1
+                return False
+            self.items[(self.head + self.size) % self.capacity] = item
+            self.size += 1
+            return True
+
+    def drain(self, limit):
+        with self.lock:
+            count = min(limit, self.size)
+            batch = []
+            for _ in range(count):
+                batch.append(self.items[self.head])
+                self.items[self.head] = None
+                self.head = (self.head + 1) % self.capacity
+            self.size -= count
+            return batch
+
+    def __len__(self):
+        return self.size
+
+
+class TelemetryRecorder:
+    def __init__(self, directory=TELEMETRY_DIR, capacity=4096, batch_size=256,
+                 flush_interval=2.0, max_file_bytes=5 * 1024 * 1024, max_files=20):
+        self.directory = directory
+        self.buffer = RingBuffer(capacity)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.written = 0
+        self.enabled = os.environ.get(TELEMETRY_ENV, "1") != "0"
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._file = None
+        self._file_bytes = 0
+        self._file_seq = 0
+
+    @property
+    def dropped(self):
+        return self.buffer.dropped
+
+    def start(self):
+        if not self.enabled or self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, session, node, choice, next_node, ms_to_decide):
+        """Queue one choice; never blocks the caller"""
+        if not self.enabled:
+            return
+        self.buffer.push((time.time(), session, node, choice, next_node, ms_to_decide))
+        if len(self.buffer) >= self.batch_size:
+            self._wake.set()
+
+    def stop(self):
+        """Write everything still queued and stop the writer"""
+        if not self._thread:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            while True:
+                batch = self.buffer.drain(self.batch_size)
+                if not batch:
+                    break
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    print(f"Error writing telemetry: {e}")
+            if self._stopping:
+                if self._file:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def _write(self, batch):
+        lines = "".join(
+            json.dumps({"ts": ts, "session": session, "node": node, "choice": choice,
+                        "next": next_node, "ms_to_decide": round(ms, 1)}) + "\n"
+            for ts, session, node, choice, next_node, ms in batch
+        )
+        if self._file is None or self._file_bytes >= self.max_file_bytes:
+            self._rotate()
+        self._file.write(lines)
+        self._file.flush()
+        self._file_bytes += len(lines)
+        self.written += len(batch)
+
+    def _rotate(self):
+        if self._file:
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        self._file_seq += 1
+        name = time.strftime("choices-%Y%m%d-%H%M%S") + f"-{os.getpid()}-{self._file_seq:04d}.jsonl"
+        path = os.path.join(self.directory, name)
+        self._file = open(path, "a")
+        self._file_bytes = self._file.tell()
+
+        files = sorted(f for f in os.listdir(self.directory) if f.startswith("choices-") and f.endswith(".jsonl"))
+        for old in files[:-self.max_files]:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except OSError:
+                pass
@@ -0,0 +1,74 @@
+"""Full GUI playthrough on a VirtualClock.
+
+Runs the real BandersnatchApp at its normal pacing from the title
+screen's start_game to one of the story's endings, pausing a virtual
+moment to think before each choice. Typing character by character, the
+click/reply beats, blinking and scroll coalescing all run as in play,
+but in virtual time, so a playthrough takes moments instead of minutes.
+Skipped when Tk has no display.
+
+    python -m pytest -q test_playthrough.py
+"""
+import os
+import random
+import shutil
+import tempfile
+import time
+import tkinter as tk
+import unittest
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("BANDERSNATCH_TELEMETRY", "0")
+
+from clock import VirtualClock
+from story import STORY
+
+MAX_TRANSITIONS = 200
+
+
+class GuiPlaythroughTest(unittest.TestCase):
+    def setUp(self):
+        try:
+            self.root = tk.Tk()
+        except tk.TclError as e:
+            self.skipTest(f"no display: {e}")
+        self.root.withdraw()
+        self.cwd = os.getcwd()
+        self.workdir = tempfile.mkdtemp(prefix="bandersnatch-test-")
+        os.chdir(self.workdir) # Saves and the layout cache stay out of the checkout
+        import app
+        self.game = app
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        self.root.destroy()
+
+    def test_start_to_ending(self):
+        clock = VirtualClock()
+        app = self.game.BandersnatchApp(self.root, clock=clock)
+        rng = random.Random(7)
+
+        def choices_ready():
+            return not app.input_locked and app.typing is None and bool(app.choices_on_screen)
+
+        started = time.perf_counter()
+        app.start_game()
+        for _ in range(MAX_TRANSITIONS):
+            self.assertTrue(clock.run_until(choices_ready, limit_ms=60 * 1000), f"stuck at {app.current_node!r}")
+            if app.current_node in STORY.endings:
+                break
+            clock.advance(rng.uniform(500, 3000)) # Think it over; blinking and scrolling timers run meanwhile
+            choice = app.choices_on_screen[rng.randrange(len(app.choices_on_screen))]
+            app.transition(choice.label, choice.target, choice.apply)
+        elapsed = time.perf_counter() - started
+        app.telemetry.stop()
+
+        self.assertIn(app.current_node, STORY.endings)
+        self.assertTrue(app.chat_history)
+        self.assertTrue(app.saves.list_slots()) # Progress was saved along the way
+        self.assertLess(elapsed, 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""SessionStore under more live connections than it has room for, and off-loop flushing."""
+import asyncio
+import json
+import unittest
+
+from server import MAX_HISTORY, Session, open_store
+
+
+class MoreConnectionsThanCapacityTest(unittest.TestCase):
+    def setUp(self):
+        self.store = open_store(":memory:", capacity=2)
+
+    def tearDown(self):
+        self.store.close()
+
+    def stored_node(self, session_id):
+        row = self.store.db.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return json.loads(row[0])["current_node"] if row else None
+
+    def test_pinned_sessions_stay_resident(self):
+        sessions = [self.store.add(Session(name), pin=True) for name in "abc"]
+        for session in sessions:
+            session.begin()
+            session.choose(0)
+            self.store.save(session)
+        self.store.flush()
+
+        for session in sessions:
+            self.assertIs(self.store.get(session.id), session)
+            self.assertEqual(self.stored_node(session.id), session.play.node_id)
+            self.assertNotEqual(session.play.node_id, "start")
+
+    def test_released_sessions_spill_with_latest_progress(self):
+        sessions = [self.store.add(Session(name), pin=True) for name in "abcd"]
+        for session in sessions:
+            session.begin()
+            session.choose(0)
+            self.store.release(session)
+        self.store.flush()
+
+        self.assertLessEqual(len(self.store), 2)
+        for session in sessions:
+            self.assertEqual(self.stored_node(session.id), session.play.node_id)
+            self.assertEqual(self.store.acquire(session.id).play.node_id, session.play.node_id)
+
+    def test_save_after_spill_is_persisted(self):
+        first = self.store.add(Session("a"))
+        first.begin()
+        for name in "bc":
+            self.store.add(Session(name))
+        self.assertNotIn("a", self.store.resident)
+
+        first.choose(0)
+        self.store.save(first)
+        self.store.flush()
+        self.assertEqual(self.stored_node("a"), first.play.node_id)
+
+    def test_flush_async_commits_off_the_loop(self):
+        session = self.store.add(Session("a"), pin=True)
+        session.begin()
+        session.choose(0)
+        self.store.save(session)
+        asyncio.run(self.store.flush_async())
+        self.assertEqual(self.stored_node("a"), session.play.node_id)
+        self.assertFalse(self.store.dirty)
+
+
+class SessionHistoryTest(unittest.TestCase):
+    def test_history_is_capped(self):
+        session = Session("loop")
+        session.begin()
+        for _ in range(MAX_HISTORY):
+            session.choose(0)
+            if session.play.node is None or not session.play.choices:
+                session.play.node_id = "start"
+                session.begin()
+        self.assertLessEqual(len(session.history), MAX_HISTORY)
+
+
+if __name__ == "__main__":
+    unittest.main()